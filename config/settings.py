@@ -4,8 +4,11 @@ Django settings for config project.
 Generated by 'django-admin startproject' using Django 5.2.8.
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -31,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expenses.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +56,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'expenses.context_processors.notifications',
             ],
         },
     },
@@ -64,11 +69,86 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('EXPENSES_DB_PATH', BASE_DIR / 'db.sqlite3'),
+        # Тестовая база — файл, а не общая память: в режиме shared cache индекс FTS5 при параллельной
+        # записи падает с "vtable constructor failed" вместо обычной блокировки "database is locked"
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+# Профиль SQLite для нагрузки с параллельными писателями (см. EXPENSES_ENV ниже и benchmark_writes).
+# IMMEDIATE берёт блокировку записи в начале транзакции: без этого параллельные
+# транзакции, начавшие с чтения, получают "database is locked" при попытке записи
+SQLITE_TUNED_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
+}
+SQLITE_TUNED_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+# Применяются expenses.db.configure_sqlite при открытии соединения
+SQLITE_PRAGMAS = {}
+
+
+# Кэш аналитики и бюджетов. Версии данных пользователей лежат в файловом кэше, общем для всех процессов
+# (воркеры, cron, management-команды): запись в одном процессе сбрасывает страницы во всех.
+# Сами страницы можно держать в памяти процесса — ключ включает версию, устаревшие записи просто не читаются.
+# EXPENSES_CACHE_DIR переносит каталог и делает файловым и кэш страниц
+CACHE_DIR = Path(os.environ.get('EXPENSES_CACHE_DIR', BASE_DIR / 'cache'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'expenses',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR / 'versions',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+if os.environ.get('EXPENSES_CACHE_DIR'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR / 'pages',
     }
+
+
+# Метрики запросов по представлениям: JSON-строки в ротируемый лог, сводка на /metrics/
+METRICS_LOG = os.environ.get('EXPENSES_METRICS_LOG', BASE_DIR / 'metrics.log')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'metrics_file': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': METRICS_LOG,
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 3,
+            'delay': True,
+            'encoding': 'utf-8',
+        },
+    },
+    'loggers': {
+        'expenses.metrics': {
+            'handlers': ['metrics_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }
 
 
+# Валюта, в которой считаются аналитика и бюджеты; курсы — модель ExchangeRate
+BASE_CURRENCY = 'RUB'
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -107,3 +187,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Настройки аутентификации
 LOGIN_URL = '/login/'
+
+
+# Окружение: EXPENSES_ENV=production включает боевой профиль
+ENVIRONMENT = os.environ.get('EXPENSES_ENV', 'development')
+
+if ENVIRONMENT == 'production':
+    DEBUG = False
+    # Ключ из репозитория публичен, без своего ключа боевой профиль не запускается
+    if not os.environ.get('DJANGO_SECRET_KEY'):
+        raise ImproperlyConfigured('Для EXPENSES_ENV=production нужно задать DJANGO_SECRET_KEY')
+    SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+    ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+    DATABASES['default'].update(
+        OPTIONS=SQLITE_TUNED_OPTIONS,
+        # Соединение живёт между запросами и проверяется перед повторным использованием
+        CONN_MAX_AGE=600,
+        CONN_HEALTH_CHECKS=True,
+    )
+    SQLITE_PRAGMAS = SQLITE_TUNED_PRAGMAS
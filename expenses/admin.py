@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import Account, Category, Transaction, Budget
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.exceptions import ValidationError
+from .bulk import bulk_delete, bulk_move, bulk_recategorize
+from .models import Account, Category, Transaction, Budget, MonthlyRollup, Notification, RecurringTransaction
+from .search import match_expression, search_transactions
 
 @admin.register(Account)
 class AccountAdmin(admin.ModelAdmin):
@@ -13,14 +19,82 @@ class CategoryAdmin(admin.ModelAdmin):
     list_filter = ('owner',)                     
     search_fields = ('name',)
 
+class TransactionActionForm(ActionForm):
+    # ID вместо выпадающих списков: категорий и счетов всех пользователей может быть очень много
+    category = forms.IntegerField(required=False, label='ID категории')
+    account = forms.IntegerField(required=False, label='ID счёта')
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('date', 'account', 'category', 'amount', 'type')
     list_filter = ('date', 'category', 'account', 'type')
-    search_fields = ('description',)
+    search_fields = ('description', 'category__name', 'account__name')
+    action_form = TransactionActionForm
+    actions = ['recategorize_selected', 'move_selected']
+
+    def action_target(self, request, model, field):
+        value = request.POST.get(field, '')
+        return model.objects.filter(pk=value).first() if value.isdigit() else None
+
+    def run_bulk(self, request, operation, *args):
+        try:
+            count = operation(*args)
+        except ValidationError as error:
+            self.message_user(request, error.message, messages.ERROR)
+        else:
+            self.message_user(request, f'Изменено транзакций: {count}', messages.SUCCESS)
+
+    @admin.action(description='Сменить категорию (пустой ID — без категории)')
+    def recategorize_selected(self, request, queryset):
+        category = self.action_target(request, Category, 'category')
+        if category is None and request.POST.get('category'):
+            self.message_user(request, 'Категория не найдена', messages.ERROR)
+            return
+        self.run_bulk(request, bulk_recategorize, queryset, category)
+
+    @admin.action(description='Перенести на счёт')
+    def move_selected(self, request, queryset):
+        account = self.action_target(request, Account, 'account')
+        if account is None:
+            self.message_user(request, 'Укажите ID существующего счёта', messages.ERROR)
+            return
+        self.run_bulk(request, bulk_move, queryset, account)
+
+    def delete_queryset(self, request, queryset):
+        # Стандартное действие удаления: балансы и агрегаты правятся одной пачкой, а не сигналом на каждую строку
+        bulk_delete(queryset)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый индекс вместо LIKE '%...%' по всем строкам; лучшие совпадения — первыми
+        # Строка без слов (например, "!!!") ничего не ищет — как и пустая
+        if not match_expression(search_term):
+            return queryset, False
+        queryset = search_transactions(queryset, search_term, ranked=True)
+        if ORDER_VAR not in request.GET:
+            queryset = queryset.order_by('search_rank', '-pk')
+        return queryset, False
 
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
     list_display = ('category', 'owner', 'period_start', 'limit_amount')
     list_filter = ('period_start',)
-    search_fields = ('category__name',)
\ No newline at end of file
+    search_fields = ('category__name',)
+
+@admin.register(MonthlyRollup)
+class MonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('month', 'owner', 'account', 'category', 'type', 'total', 'count')
+    list_filter = ('month', 'type')
+    search_fields = ('owner__username', 'category__name')
+
+
+@admin.register(RecurringTransaction)
+class RecurringTransactionAdmin(admin.ModelAdmin):
+    list_display = ('account', 'category', 'amount', 'type', 'frequency', 'interval', 'next_run', 'is_active')
+    list_filter = ('frequency', 'type', 'is_active')
+    search_fields = ('description', 'owner__username')
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'owner', 'budget', 'threshold', 'spent', 'limit_amount', 'read_at')
+    list_filter = ('threshold',)
+    search_fields = ('owner__username', 'budget__category__name')
@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from .models import Budget, Notification
+
+THRESHOLDS = (50, 80, 100)
+
+
+def reached_threshold(spent, limit):
+    if limit <= 0:
+        return THRESHOLDS[-1] if spent > 0 else 0
+    percent = spent * 100 / limit
+    return max((threshold for threshold in THRESHOLDS if percent >= threshold), default=0)
+
+
+def evaluate(budgets):
+    # budgets — запрос с аннотацией spent (BudgetQuerySet.with_spent): суммы берутся из помесячных агрегатов
+    notifications = []
+    for budget in budgets:
+        level = reached_threshold(budget.spent, budget.limit_amount)
+        if level == budget.last_alert_threshold:
+            continue
+        # Условное обновление: параллельная запись не отправит второе уведомление о том же пороге
+        updated = Budget.objects.filter(
+            pk=budget.pk, last_alert_threshold=budget.last_alert_threshold
+        ).update(last_alert_threshold=level)
+        # При снижении расходов порог только опускается, чтобы повторное превышение снова сработало
+        if updated and level > budget.last_alert_threshold:
+            notifications.append(Notification(
+                owner_id=budget.owner_id,
+                budget=budget,
+                threshold=level,
+                spent=budget.spent,
+                limit_amount=budget.limit_amount,
+            ))
+    Notification.objects.bulk_create(notifications)
+    return notifications
+
+
+def check_spending(keys):
+    # keys — (владелец, категория, месяц) изменённых расходных агрегатов; бюджеты ищутся
+    # по предкам категории через таблицу замыкания и уникальный индекс (владелец, категория, месяц)
+    groups = defaultdict(set)
+    for owner_id, category_id, month in keys:
+        if category_id is not None:
+            groups[owner_id, month].add(category_id)
+
+    notifications = []
+    for (owner_id, month), category_ids in groups.items():
+        budgets = Budget.objects.filter(
+            owner_id=owner_id,
+            period_start=month,
+            category__descendant_links__descendant_id__in=category_ids,
+        ).distinct().with_spent()
+        notifications.extend(evaluate(budgets))
+    return notifications
+
+
+def check_budget(budget):
+    return evaluate(Budget.objects.filter(pk=budget.pk).with_spent())
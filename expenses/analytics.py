@@ -0,0 +1,313 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import forecast
+from .currency import converted
+from .models import CategoryClosure, MonthlyRollup, Transaction
+
+GRANULARITY_DAY = 'day'
+GRANULARITY_WEEK = 'week'
+GRANULARITY_MONTH = 'month'
+
+TRUNC_FUNCTIONS = {
+    GRANULARITY_DAY: TruncDay,
+    GRANULARITY_WEEK: TruncWeek,
+    GRANULARITY_MONTH: TruncMonth,
+}
+PERIOD_STEPS = {
+    GRANULARITY_DAY: relativedelta(days=1),
+    GRANULARITY_WEEK: relativedelta(weeks=1),
+    GRANULARITY_MONTH: relativedelta(months=1),
+}
+PERIOD_LABEL_FORMATS = {
+    GRANULARITY_DAY: '%d.%m.%Y',
+    GRANULARITY_WEEK: '%d.%m.%Y',
+    GRANULARITY_MONTH: '%b %Y',
+}
+
+DEFAULT_GRANULARITY = GRANULARITY_MONTH
+DEFAULT_PERIODS = 6
+MAX_PERIODS = 366
+
+ZERO = Decimal('0.00')
+
+
+def period_start(day, granularity):
+    if granularity == GRANULARITY_MONTH:
+        return day.replace(day=1)
+    if granularity == GRANULARITY_WEEK:
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def period_end(day, granularity):
+    return period_start(day, granularity) + PERIOD_STEPS[granularity] - timedelta(days=1)
+
+
+def period_range(date_from, date_to, granularity):
+    step = PERIOD_STEPS[granularity]
+    current = period_start(date_from, granularity)
+    periods = []
+    while current <= date_to:
+        periods.append(current)
+        current += step
+    return periods
+
+
+def window_ending(day, periods, granularity):
+    last = period_start(day, granularity)
+    first = last - PERIOD_STEPS[granularity] * (periods - 1)
+    return first, period_end(day, granularity)
+
+
+GROUP_FIELDS = ('period', 'category_id', 'category__name', 'account_id', 'account__name')
+
+
+def grouped_queryset(owner, date_from, date_to, granularity=DEFAULT_GRANULARITY, fields=GROUP_FIELDS):
+    if granularity == GRANULARITY_MONTH:
+        queryset = (
+            MonthlyRollup.objects
+            .filter(owner=owner, month__range=(period_start(date_from, GRANULARITY_MONTH), date_to))
+            .annotate(period=F('month'))
+        )
+        # Помесячные суммы пересчитываются по курсу на первое число месяца
+        amount = converted('total', date_ref='month')
+    else:
+        queryset = (
+            Transaction.objects
+            .filter(owner=owner, date__range=(date_from, date_to))
+            .annotate(period=TRUNC_FUNCTIONS[granularity]('date'))
+        )
+        amount = converted('amount')
+
+    return (
+        queryset
+        .values(*fields)
+        .annotate(
+            income=Sum(amount, filter=Q(type=Transaction.TYPE_INCOME)),
+            expense=Sum(amount, filter=Q(type=Transaction.TYPE_EXPENSE)),
+        )
+        .order_by()
+    )
+
+
+def closure_links_queryset(owner):
+    return (
+        CategoryClosure.objects
+        .filter(ancestor__owner=owner)
+        .values_list('ancestor_id', 'ancestor__name', 'descendant_id')
+    )
+
+
+def closure_links(owner):
+    return list(closure_links_queryset(owner))
+
+
+def parse_day(value):
+    # Несуществующая дата (2026-02-30) считается отсутствующей, а не ошибкой запроса
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def parse_window(params):
+    granularity = params.get('granularity')
+    if granularity not in TRUNC_FUNCTIONS:
+        granularity = DEFAULT_GRANULARITY
+
+    try:
+        periods = int(params.get('periods', DEFAULT_PERIODS))
+    except ValueError:
+        periods = DEFAULT_PERIODS
+    periods = max(1, min(periods, MAX_PERIODS))
+
+    date_to = parse_day(params.get('date_to')) or timezone.now().date()
+    date_from = parse_day(params.get('date_from'))
+    if date_from and date_from <= date_to:
+        date_to = period_end(date_to, granularity)
+        if len(period_range(date_from, date_to, granularity)) > MAX_PERIODS:
+            date_from, date_to = window_ending(date_to, MAX_PERIODS, granularity)
+    else:
+        date_from, date_to = window_ending(date_to, periods, granularity)
+
+    return date_from, date_to, granularity
+
+
+def parse_period(value):
+    # Период бюджета в виде YYYY-MM; без параметра фильтра нет, некорректное значение — текущий месяц
+    if not value:
+        return None
+    try:
+        period = parse_date(f'{value}-01')
+    except ValueError:
+        period = None
+    return period or timezone.localdate().replace(day=1)
+
+
+class AnalyticsReport:
+    def __init__(self, rows, periods, granularity, links=()):
+        self.granularity = granularity
+        self.periods = periods
+        self.links = links
+        self.rows = [
+            dict(row, income=row['income'] or ZERO, expense=row['expense'] or ZERO)
+            for row in rows
+        ]
+
+    @property
+    def current_period(self):
+        return self.periods[-1] if self.periods else None
+
+    def _rows_for(self, period):
+        if period is None:
+            return self.rows
+        return [row for row in self.rows if row['period'] == period]
+
+    def totals(self, period=None):
+        income = expense = ZERO
+        for row in self._rows_for(period):
+            income += row['income']
+            expense += row['expense']
+        return income, expense
+
+    def series(self):
+        buckets = {period: [ZERO, ZERO] for period in self.periods}
+        for row in self.rows:
+            bucket = buckets.get(row['period'])
+            if bucket is not None:
+                bucket[0] += row['income']
+                bucket[1] += row['expense']
+        label_format = PERIOD_LABEL_FORMATS[self.granularity]
+        return [
+            {
+                'period': period,
+                'month': period.strftime(label_format),
+                'income': income,
+                'expense': expense,
+            }
+            for period, (income, expense) in buckets.items()
+        ]
+
+    def by_category(self, tr_type, period=None):
+        totals = {}
+        for row in self._rows_for(period):
+            amount = row[tr_type]
+            if amount:
+                totals[row['category__name']] = totals.get(row['category__name'], ZERO) + amount
+        return [
+            {'category__name': name, 'total': total}
+            for name, total in sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+    def by_category_tree(self, tr_type, period=None):
+        # Суммы по поддеревьям: каждая категория получает суммы всех своих потомков по таблице замыкания
+        own = {}
+        for row in self._rows_for(period):
+            if row[tr_type] and row['category_id'] is not None:
+                own[row['category_id']] = own.get(row['category_id'], ZERO) + row[tr_type]
+
+        totals = {}
+        for ancestor_id, name, descendant_id in self.links:
+            amount = own.get(descendant_id)
+            if amount:
+                entry = totals.setdefault(ancestor_id, {
+                    'category_id': ancestor_id,
+                    'category__name': name,
+                    'own': own.get(ancestor_id, ZERO),
+                    'total': ZERO,
+                })
+                entry['total'] += amount
+        return sorted(totals.values(), key=lambda entry: entry['total'], reverse=True)
+
+    def by_account(self, period=None):
+        totals = {}
+        for row in self._rows_for(period):
+            entry = totals.setdefault(row['account_id'], {
+                'account__name': row['account__name'],
+                'income': ZERO,
+                'expense': ZERO,
+            })
+            entry['income'] += row['income']
+            entry['expense'] += row['expense']
+        return sorted(totals.values(), key=lambda entry: entry['expense'], reverse=True)
+
+
+def forecast_date(date_to):
+    # Прогноз строится на конец окна, но не позже сегодняшнего дня
+    return min(date_to, timezone.localdate())
+
+
+def build_report(owner, date_from, date_to, granularity=DEFAULT_GRANULARITY):
+    rows = grouped_queryset(owner, date_from, date_to, granularity)
+    return AnalyticsReport(
+        list(rows), period_range(date_from, date_to, granularity), granularity, links=closure_links(owner)
+    )
+
+
+def current_report(owner, date_to, granularity=DEFAULT_GRANULARITY):
+    # Карточки и таблицы страницы показывают только текущий период — окно графиков для них не нужно
+    current = period_start(date_to, granularity)
+    rows = grouped_queryset(owner, current, date_to, granularity)
+    return AnalyticsReport(list(rows), [current], granularity, links=closure_links(owner))
+
+
+async def fetch_all(queryset):
+    return [row async for row in queryset]
+
+
+async def load_totals(owner, date_from, date_to, granularity):
+    current = period_start(date_to, granularity)
+    rows = await fetch_all(grouped_queryset(owner, current, date_to, granularity, fields=('account_id', 'account__name')))
+    report = AnalyticsReport(rows, [current], granularity)
+    income, expense = report.totals()
+    return {
+        'period': current,
+        'income': income,
+        'expense': expense,
+        'balance': income - expense,
+        'by_account': report.by_account(),
+    }
+
+
+async def load_categories(owner, date_from, date_to, granularity):
+    current = period_start(date_to, granularity)
+    rows = await fetch_all(grouped_queryset(owner, current, date_to, granularity, fields=('category_id', 'category__name')))
+    links = await fetch_all(closure_links_queryset(owner))
+    report = AnalyticsReport(rows, [current], granularity, links=links)
+    return {
+        'expense': report.by_category('expense'),
+        'income': report.by_category('income'),
+        'expense_tree': report.by_category_tree('expense'),
+    }
+
+
+async def load_series(owner, date_from, date_to, granularity):
+    rows = await fetch_all(grouped_queryset(owner, date_from, date_to, granularity, fields=('period',)))
+    return AnalyticsReport(rows, period_range(date_from, date_to, granularity), granularity).series()
+
+
+async def load_forecast(owner, date_from, date_to, granularity):
+    today = forecast_date(date_to)
+    rows = await fetch_all(forecast.forecast_queryset(owner, today))
+    return forecast.build_forecast(rows, today)
+
+
+SECTIONS = {
+    'totals': load_totals,
+    'categories': load_categories,
+    'series': load_series,
+    'forecast': load_forecast,
+}
+
+
+async def load_sections(owner, date_from, date_to, granularity, names=tuple(SECTIONS)):
+    # Запросы async ORM идут через один поток и одно соединение с базой, поэтому разделы
+    # загружаются по очереди: asyncio.gather не дал бы параллельности, только лишние переключения
+    return {name: await SECTIONS[name](owner, date_from, date_to, granularity) for name in names}
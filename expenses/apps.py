@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expenses'
+
+    def ready(self):
+        from .db import configure_sqlite
+
+        connection_created.connect(configure_sqlite, dispatch_uid='expenses.configure_sqlite')
@@ -0,0 +1,88 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .ledger import LedgerBatch, signals_suppressed
+from .models import Transaction, transaction_fingerprint
+
+ACTION_CATEGORY = 'category'
+ACTION_ACCOUNT = 'account'
+ACTION_DELETE = 'delete'
+
+ACTION_CHOICES = [
+    (ACTION_CATEGORY, 'Сменить категорию'),
+    (ACTION_ACCOUNT, 'Перенести на счёт'),
+    (ACTION_DELETE, 'Удалить'),
+]
+
+FINGERPRINT_BATCH_SIZE = 500
+
+
+def check_owner(queryset, owner_id, message):
+    if queryset.exclude(owner_id=owner_id).exists():
+        raise ValidationError(message)
+
+
+def rewrite(queryset, changes, extra_fields=()):
+    # Один UPDATE на всю выборку; баланс, агрегаты и дневные итоги правятся одной пачкой по старым и новым состояниям
+    with transaction.atomic():
+        states = list(queryset.values(*Transaction.TRACKED_FIELDS, *extra_fields))
+        if not states:
+            return states
+        queryset.update(**changes)
+
+        ledger = LedgerBatch()
+        for state in states:
+            ledger.remove(state)
+            ledger.add(dict(state, **changes), existing=True)
+        ledger.apply()
+    return states
+
+
+def bulk_recategorize(queryset, category):
+    if category is not None:
+        check_owner(queryset, category.owner_id, 'Категория принадлежит другому пользователю')
+    queryset = queryset.exclude(category=category) if category is not None else queryset.filter(category__isnull=False)
+    return len(rewrite(queryset, {'category_id': category.pk if category is not None else None}))
+
+
+def bulk_move(queryset, account):
+    check_owner(queryset, account.owner_id, 'Счёт принадлежит другому пользователю')
+    with transaction.atomic():
+        # Ключ строки выписки относится к прежнему счёту
+        moved = rewrite(
+            queryset.exclude(account=account), {'account_id': account.pk, 'import_key': None},
+            extra_fields=('description',),
+        )
+        # Хеш для поиска дублей при импорте включает счёт
+        changed = [
+            Transaction(
+                pk=state['id'],
+                fingerprint=transaction_fingerprint(account.pk, state['date'], state['amount'], state['description']),
+            )
+            for state in moved
+        ]
+        Transaction.objects.bulk_update(changed, ['fingerprint'], batch_size=FINGERPRINT_BATCH_SIZE)
+    return len(moved)
+
+
+def bulk_delete(queryset):
+    with transaction.atomic():
+        states = list(queryset.values(*Transaction.TRACKED_FIELDS))
+        if not states:
+            return 0
+        with signals_suppressed():
+            queryset.delete()
+
+        ledger = LedgerBatch()
+        for state in states:
+            ledger.remove(state)
+        ledger.apply()
+    return len(states)
+
+
+def apply_action(queryset, action, category=None, account=None):
+    if action == ACTION_CATEGORY:
+        return bulk_recategorize(queryset, category)
+    if action == ACTION_ACCOUNT:
+        return bulk_move(queryset, account)
+    return bulk_delete(queryset)
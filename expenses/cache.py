@@ -0,0 +1,131 @@
+import threading
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import transaction
+
+CACHE_ALIAS = 'default'
+# Версии хранятся отдельно, в кэше, общем для всех процессов
+VERSION_ALIAS = 'versions'
+DEFAULT_TIMEOUT = 60 * 60
+MISSING = object()
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = {}
+            self.misses = {}
+
+    def record(self, section, hit):
+        counters = self.hits if hit else self.misses
+        with self._lock:
+            counters[section] = counters.get(section, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            sections = sorted(set(self.hits) | set(self.misses))
+            result = {}
+            for section in sections:
+                hits, misses = self.hits.get(section, 0), self.misses.get(section, 0)
+                result[section] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / (hits + misses), 3),
+                }
+            return result
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_version_cache():
+    return caches[VERSION_ALIAS]
+
+
+# Общая версия для данных, от которых зависят все пользователи (курсы валют, пересборка агрегатов)
+GLOBAL_VERSION_KEY = 'expenses:version'
+
+
+def version_key(user_id):
+    return f'expenses:user:{user_id}:version'
+
+
+def new_version():
+    # Случайная версия, а не счётчик: файловый кэш не умеет атомарный incr, а два процесса,
+    # сбросившие кэш одновременно, не должны получить одинаковую версию
+    return uuid.uuid4().hex
+
+
+def current_version(key):
+    cache = get_version_cache()
+    version = cache.get(key)
+    if version is None:
+        # После вытеснения ключа версия новая, старые записи не оживут
+        cache.add(key, new_version(), None)
+        version = cache.get(key) or new_version()
+    return version
+
+
+def user_version(user_id):
+    return current_version(version_key(user_id))
+
+
+def bump(key):
+    get_version_cache().set(key, new_version(), None)
+
+
+def bump_version(user_id):
+    bump(version_key(user_id))
+
+
+def bump_global_version():
+    bump(GLOBAL_VERSION_KEY)
+
+
+def invalidate_user(user_id):
+    if user_id is None:
+        return
+    bump_version(user_id)
+    # Повтор после коммита: страница, посчитанная до коммита по старым данным, не останется в кэше
+    transaction.on_commit(lambda: bump_version(user_id))
+
+
+def cache_key(user_id, section, params):
+    suffix = ':'.join(str(value) for value in params)
+    version = f'{current_version(GLOBAL_VERSION_KEY)}.{user_version(user_id)}'
+    return f'expenses:user:{user_id}:v{version}:{section}:{suffix}'
+
+
+def cached_for_user(user_id, section, params, compute, timeout=DEFAULT_TIMEOUT):
+    cache = get_cache()
+    key = cache_key(user_id, section, params)
+
+    value = cache.get(key, MISSING)
+    stats.record(section, hit=value is not MISSING)
+    if value is MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+async def acached_for_user(user_id, section, params, compute, timeout=DEFAULT_TIMEOUT):
+    # compute — корутинная функция; ключ строится синхронно, как и в cached_for_user
+    cache = get_cache()
+    key = await sync_to_async(cache_key)(user_id, section, params)
+
+    value = await cache.aget(key, MISSING)
+    stats.record(section, hit=value is not MISSING)
+    if value is MISSING:
+        value = await compute()
+        await cache.aset(key, value, timeout)
+    return value
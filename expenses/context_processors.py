@@ -0,0 +1,14 @@
+from .cache import cached_for_user
+from .models import Notification
+
+
+def notifications(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    # Счётчик для значка в меню; кэш сбрасывается вместе с версией пользователя
+    unread = cached_for_user(
+        user.pk, 'notifications', [],
+        lambda: Notification.objects.filter(owner=user, read_at__isnull=True).count()
+    )
+    return {'unread_notifications': unread}
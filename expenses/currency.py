@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .cache import bump_global_version
+from .models import Account, ExchangeRate
+
+ONE = Decimal('1')
+CENT = Decimal('0.01')
+RATE_FIELD = models.DecimalField(max_digits=18, decimal_places=8)
+MONEY_FIELD = models.DecimalField(max_digits=20, decimal_places=2)
+
+
+class MissingRate(LookupError):
+    pass
+
+
+def base_currency():
+    return settings.BASE_CURRENCY
+
+
+def rate_expression(currency_ref, date_ref):
+    # Курс на дату (последний известный до неё, иначе ближайший после); базовая валюта — 1 без подзапроса.
+    # Без курсов выражение даёт NULL: такие суммы не попадают в Sum, а валюта показывается в missing_rates
+    rates = ExchangeRate.objects.filter(currency=OuterRef(currency_ref))
+    before = rates.filter(date__lte=OuterRef(date_ref)).order_by('-date').values('rate')[:1]
+    after = rates.filter(date__gt=OuterRef(date_ref)).order_by('date').values('rate')[:1]
+    return Case(
+        When(**{currency_ref: base_currency()}, then=Value(ONE)),
+        default=Coalesce(
+            Subquery(before, output_field=RATE_FIELD),
+            Subquery(after, output_field=RATE_FIELD),
+            output_field=RATE_FIELD,
+        ),
+        output_field=RATE_FIELD,
+    )
+
+
+def converted(field, currency_ref='account__currency', date_ref='date'):
+    return models.ExpressionWrapper(F(field) * rate_expression(currency_ref, date_ref), output_field=MONEY_FIELD)
+
+
+def rate_on(currency, day):
+    # Без кэша в процессе: курсы загружает отдельная команда, и воркеры должны сразу видеть новые
+    if currency == base_currency():
+        return ONE
+    rates = ExchangeRate.objects.filter(currency=currency)
+    rate = rates.filter(date__lte=day).order_by('-date').values_list('rate', flat=True).first()
+    if rate is None:
+        rate = rates.filter(date__gt=day).order_by('date').values_list('rate', flat=True).first()
+    if rate is None:
+        raise MissingRate(currency)
+    return rate
+
+
+def convert(amount, currency, day):
+    return (amount * rate_on(currency, day)).quantize(CENT)
+
+
+def missing_rates(owner):
+    # Валюты счетов пользователя, для которых не загружено ни одного курса
+    accounts = Account.objects.filter(owner=owner).exclude(currency=base_currency())
+    currencies = set(accounts.values_list('currency', flat=True))
+    if not currencies:
+        return []
+    known = set(ExchangeRate.objects.filter(currency__in=currencies).values_list('currency', flat=True).distinct())
+    return sorted(currencies - known)
+
+
+def rates_changed():
+    bump_global_version()
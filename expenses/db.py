@@ -0,0 +1,13 @@
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    # PRAGMA действуют на соединение, поэтому выставляются при каждом новом подключении
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,134 @@
+from calendar import monthrange
+from decimal import Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db.models import Sum
+
+from .currency import converted
+from .models import MonthlyRollup, Transaction
+
+HISTORY_MONTHS = 24
+MOVING_WINDOW = 3
+SEASON = 12
+MIN_HISTORY = 3
+ANOMALY_Z = 2.0
+MAX_SEASONAL_FACTOR = 3.0
+
+
+def forecast_queryset(owner, today, months=HISTORY_MONTHS):
+    # Один агрегат по помесячным суммам: по строке на (категория, месяц), включая текущий месяц
+    current = today.replace(day=1)
+    return (
+        MonthlyRollup.objects
+        .filter(
+            owner=owner,
+            type=Transaction.TYPE_EXPENSE,
+            category__isnull=False,
+            month__range=(current - relativedelta(months=months), current),
+        )
+        .values('category_id', 'category__name', 'month')
+        .annotate(total=Sum(converted('total', date_ref='month')))
+        .order_by()
+    )
+
+
+def month_number(day):
+    return day.year * 12 + day.month - 1
+
+
+def spending_matrix(rows, today, months=HISTORY_MONTHS):
+    # Строки матрицы — категории, столбцы — месяцы от самого старого до текущего (последний столбец)
+    names = {}
+    for row in rows:
+        names.setdefault(row['category_id'], row['category__name'])
+    category_ids = np.fromiter(names, dtype=np.int64, count=len(names))
+    matrix = np.zeros((len(category_ids), months + 1))
+    if rows:
+        row_ids = np.fromiter((row['category_id'] for row in rows), dtype=np.int64, count=len(rows))
+        columns = np.fromiter((month_number(row['month']) for row in rows), dtype=np.int64, count=len(rows))
+        totals = np.fromiter((row['total'] or 0 for row in rows), dtype=np.float64, count=len(rows))
+        order = np.argsort(category_ids)
+        positions = order[np.searchsorted(category_ids, row_ids, sorter=order)]
+        np.add.at(matrix, (positions, columns - month_number(today) + months), totals)
+    return category_ids, [names[category_id] for category_id in category_ids.tolist()], matrix
+
+
+def moving_averages(history, window=MOVING_WINDOW):
+    # Скользящее среднее по всем категориям сразу через накопленные суммы
+    cumulative = np.cumsum(np.pad(history, ((0, 0), (1, 0))), axis=1)
+    return (cumulative[:, window:] - cumulative[:, :-window]) / window
+
+
+def project(matrix, today):
+    history, spent = matrix[:, :-1], matrix[:, -1]
+    days = monthrange(today.year, today.month)[1]
+    elapsed = today.day / days
+
+    baseline = moving_averages(history)[:, -1]
+
+    # Сезонность: тот же месяц прошлого года относительно среднего за последние 12 месяцев
+    year = history[:, -SEASON:]
+    year_mean = year.mean(axis=1)
+    seasonal = np.divide(year[:, 0], year_mean, out=np.ones_like(year_mean), where=year_mean > 0)
+    seasonal = np.where(np.count_nonzero(year, axis=1) >= MIN_HISTORY, seasonal, 1.0)
+    expected = baseline * np.clip(seasonal, 0.0, MAX_SEASONAL_FACTOR)
+
+    # В начале месяца прогноз опирается на историю, к концу — на фактический темп трат
+    run_rate = spent / elapsed
+    remaining = (1 - elapsed) * (elapsed * run_rate + (1 - elapsed) * expected)
+    projected = spent + remaining
+
+    deviation = year.std(axis=1)
+    z_scores = np.divide(projected - year_mean, deviation, out=np.zeros_like(deviation), where=deviation > 0)
+    z_scores = np.where(np.count_nonzero(year, axis=1) >= MIN_HISTORY, z_scores, 0.0)
+
+    return {
+        'spent': spent,
+        'moving_average': baseline,
+        'seasonal': seasonal,
+        'expected': expected,
+        'forecast': projected,
+        'mean': year_mean,
+        'z_score': z_scores,
+        'anomaly': np.abs(z_scores) >= ANOMALY_Z,
+    }, elapsed
+
+
+def money(value):
+    return Decimal(f'{value:.2f}')
+
+
+def build_forecast(rows, today, months=HISTORY_MONTHS):
+    category_ids, names, matrix = spending_matrix(rows, today, months)
+    result, elapsed = project(matrix, today)
+
+    # Сначала аномалии, затем по величине прогноза
+    order = np.lexsort((-result['forecast'], ~result['anomaly']))
+    values = {name: column[order].tolist() for name, column in result.items()}
+    ids = category_ids[order].tolist()
+    categories = [
+        {
+            'category_id': category_id,
+            'category__name': names[index],
+            'spent': money(values['spent'][position]),
+            'moving_average': money(values['moving_average'][position]),
+            'forecast': money(values['forecast'][position]),
+            'mean': money(values['mean'][position]),
+            'z_score': round(values['z_score'][position], 2),
+            'anomaly': values['anomaly'][position],
+        }
+        for position, (category_id, index) in enumerate(zip(ids, order.tolist()))
+    ]
+    return {
+        'month': today.replace(day=1),
+        'elapsed': round(elapsed, 3),
+        'spent': money(result['spent'].sum()),
+        'forecast': money(result['forecast'].sum()),
+        'anomalies': int(result['anomaly'].sum()),
+        'categories': categories,
+    }
+
+
+def spending_forecast(owner, today, months=HISTORY_MONTHS):
+    return build_forecast(list(forecast_queryset(owner, today, months)), today, months)
@@ -1,6 +1,10 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from .bulk import ACTION_ACCOUNT, ACTION_CHOICES
+from .importers import DEFAULT_BATCH_SIZE, FORMAT_CHOICES
+from .models import Account, Budget, Category, Transaction
+from .tree import CategoryTree
 
 class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -14,4 +18,94 @@ class CustomUserCreationForm(UserCreationForm):
         user.email = self.cleaned_data['email']
         if commit:
             user.save()
-        return user
\ No newline at end of file
+        return user
+
+
+class TransactionImportForm(forms.Form):
+    account = forms.ModelChoiceField(queryset=Account.objects.none(), label='Счёт')
+    file = forms.FileField(label='Файл выписки')
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, label='Формат')
+    batch_size = forms.IntegerField(min_value=1, max_value=10000, initial=DEFAULT_BATCH_SIZE, label='Размер пачки')
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['account'].queryset = Account.objects.filter(owner=user)
+
+
+class TransactionFilterForm(forms.Form):
+    date_from = forms.DateField(required=False, label='Дата с')
+    date_to = forms.DateField(required=False, label='Дата по')
+    category = forms.ModelChoiceField(queryset=Category.objects.none(), required=False, label='Категория')
+    account = forms.ModelChoiceField(queryset=Account.objects.none(), required=False, label='Счёт')
+    type = forms.ChoiceField(choices=Transaction.TYPE_CHOICES, required=False, label='Тип')
+    q = forms.CharField(required=False, label='Поиск')
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['category'].queryset = Category.objects.filter(owner=user)
+        self.fields['account'].queryset = Account.objects.filter(owner=user)
+
+
+class TransactionBulkForm(forms.Form):
+    action = forms.ChoiceField(choices=ACTION_CHOICES, label='Действие')
+    ids = forms.ModelMultipleChoiceField(queryset=Transaction.objects.none(), required=False, label='Транзакции')
+    select_all = forms.BooleanField(required=False, label='Все транзакции по фильтру')
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.none(), required=False, empty_label='Без категории', label='Категория'
+    )
+    account = forms.ModelChoiceField(queryset=Account.objects.none(), required=False, label='Счёт')
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['ids'].queryset = Transaction.objects.filter(owner=user)
+        self.fields['category'].queryset = Category.objects.filter(owner=user)
+        self.fields['account'].queryset = Account.objects.filter(owner=user)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Чужие или несуществующие значения уже дали ошибку поля — второе сообщение не нужно
+        if not cleaned_data.get('select_all') and not cleaned_data.get('ids') and 'ids' not in self.errors:
+            raise forms.ValidationError('Не выбрано ни одной транзакции')
+        if cleaned_data.get('action') == ACTION_ACCOUNT and not cleaned_data.get('account') and 'account' not in self.errors:
+            raise forms.ValidationError('Выберите счёт')
+        return cleaned_data
+
+
+class BudgetForm(forms.ModelForm):
+    class Meta:
+        model = Budget
+        fields = ['period_start', 'limit_amount']
+
+    def __init__(self, *args, user=None, category_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.category_id = category_id if category_id is not None else self.instance.category_id
+
+    def clean_period_start(self):
+        # Бюджет задаётся на месяц: любая дата месяца приводится к первому числу, как и в Budget.save
+        period_start = self.cleaned_data['period_start'].replace(day=1)
+        duplicates = Budget.objects.filter(owner=self.user, category_id=self.category_id, period_start=period_start)
+        if self.instance.pk:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise forms.ValidationError('Бюджет этой категории на этот месяц уже есть')
+        return period_start
+
+class CategoryForm(forms.ModelForm):
+    class Meta:
+        model = Category
+        fields = ['name', 'parent']
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tree = CategoryTree.for_owner(user)
+        parent = self.fields['parent']
+        parent.queryset = Category.objects.filter(owner=user)
+        # Сам узел и его потомки в список не попадают; отступ показывает вложенность
+        parent.choices = [('', parent.empty_label), *self.tree.choices(exclude=self.instance.pk)]
+
+    def clean_parent(self):
+        parent = self.cleaned_data['parent']
+        if parent and not self.tree.can_attach(self.instance.pk, parent.pk):
+            raise forms.ValidationError('Категория не может быть вложена в саму себя или в свою подкатегорию')
+        return parent
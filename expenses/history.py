@@ -0,0 +1,57 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import DailyBalance
+
+DEFAULT_DAYS = 90
+MAX_DAYS = 3660
+
+ZERO = Decimal('0.00')
+
+
+def parse_range(params):
+    try:
+        date_to = parse_date(params.get('date_to') or '')
+        date_from = parse_date(params.get('date_from') or '')
+    except ValueError:
+        date_to = date_from = None
+    date_to = date_to or timezone.localdate()
+    if not date_from or date_from > date_to:
+        date_from = date_to - timedelta(days=DEFAULT_DAYS - 1)
+    # Длинные диапазоны обрезаются с начала: последние дни важнее
+    return max(date_from, date_to - timedelta(days=MAX_DAYS - 1)), date_to
+
+
+def history_querysets(account_id, date_from, date_to):
+    # Оба запроса идут по уникальному индексу (account, date): итог до начала окна и дни внутри него
+    rows = DailyBalance.objects.filter(account_id=account_id)
+    before = rows.filter(date__lt=date_from).order_by('-date').values_list('total', flat=True)[:1]
+    days = rows.filter(date__range=(date_from, date_to)).order_by('date').values_list('date', 'change', 'total')
+    return before, days
+
+
+def build_history(opening_balance, before, days, date_from, date_to):
+    total = before[0] if before else ZERO
+    changes = {day: (change, day_total) for day, change, day_total in days}
+    points = []
+    day = date_from
+    while day <= date_to:
+        change, total = changes.get(day, (ZERO, total))
+        points.append({'date': day, 'change': change, 'balance': opening_balance + total})
+        day += timedelta(days=1)
+    return points
+
+
+def balance_history(account, date_from, date_to):
+    before, days = history_querysets(account.pk, date_from, date_to)
+    return build_history(account.opening_balance, list(before), list(days), date_from, date_to)
+
+
+async def load_history(account, date_from, date_to):
+    before, days = history_querysets(account.pk, date_from, date_to)
+    return build_history(
+        account.opening_balance, [total async for total in before], [row async for row in days], date_from, date_to
+    )
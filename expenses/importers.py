@@ -0,0 +1,212 @@
+import csv
+import itertools
+import re
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+
+from .ledger import LedgerBatch
+from .models import Category, Transaction, statement_import_key, transaction_fingerprint
+
+FORMAT_CSV = 'csv'
+FORMAT_OFX = 'ofx'
+FORMAT_CHOICES = [
+    (FORMAT_CSV, 'CSV'),
+    (FORMAT_OFX, 'OFX'),
+]
+
+DEFAULT_BATCH_SIZE = 500
+CONFLICT_ATTEMPTS = 3
+# Transaction.amount: 12 знаков, из них 2 после запятой
+MAX_AMOUNT = Decimal('1e10')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y')
+TYPE_ALIASES = {
+    'income': Transaction.TYPE_INCOME,
+    'доход': Transaction.TYPE_INCOME,
+    'expense': Transaction.TYPE_EXPENSE,
+    'расход': Transaction.TYPE_EXPENSE,
+}
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class StatementError(ValueError):
+    pass
+
+
+def parse_date(value, formats=DATE_FORMATS):
+    for fmt in formats:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f'Неверная дата: {value!r}')
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(value.strip().replace(' ', '').replace(',', '.')).quantize(Decimal('0.01'))
+    except ArithmeticError:
+        raise StatementError(f'Неверная сумма: {value!r}')
+    if not amount.is_finite() or abs(amount) >= MAX_AMOUNT:
+        raise StatementError(f'Неверная сумма: {value!r}')
+    # Проверка после округления: 0.001 превращается в 0.00
+    if not amount:
+        raise StatementError('Нулевая сумма')
+    return amount
+
+
+def parse_csv(stream):
+    header = stream.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    reader = csv.DictReader(itertools.chain([header], stream), delimiter=delimiter)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+
+    for row in reader:
+        line = reader.line_num
+        try:
+            amount = parse_amount(row.get('amount') or '')
+            tr_type = (row.get('type') or '').strip().lower()
+            if tr_type:
+                if tr_type not in TYPE_ALIASES:
+                    raise StatementError(f'Неизвестный тип: {tr_type!r}')
+                tr_type = TYPE_ALIASES[tr_type]
+            else:
+                tr_type = Transaction.TYPE_INCOME if amount > 0 else Transaction.TYPE_EXPENSE
+            yield {
+                'line': line,
+                'date': parse_date(row.get('date') or ''),
+                'amount': abs(amount),
+                'type': tr_type,
+                'category': (row.get('category') or '').strip(),
+                'description': (row.get('description') or '').strip(),
+            }
+        except StatementError as exc:
+            yield {'line': line, 'error': str(exc)}
+
+
+def parse_ofx(stream):
+    current = None
+    start_line = 0
+    for line, text in enumerate(stream, start=1):
+        for closing, tag, value in OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    current, start_line = {}, line
+                elif current is not None:
+                    yield _ofx_row(current, start_line)
+                    current = None
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def _ofx_row(fields, line):
+    try:
+        amount = parse_amount(fields.get('TRNAMT', ''))
+        description = ' — '.join(filter(None, [fields.get('NAME'), fields.get('MEMO')]))
+        return {
+            'line': line,
+            'date': parse_date(fields.get('DTPOSTED', '')[:8], formats=('%Y%m%d',)),
+            'amount': abs(amount),
+            'type': Transaction.TYPE_INCOME if amount > 0 else Transaction.TYPE_EXPENSE,
+            'category': '',
+            'description': description,
+        }
+    except StatementError as exc:
+        return {'line': line, 'error': str(exc)}
+
+
+PARSERS = {
+    FORMAT_CSV: parse_csv,
+    FORMAT_OFX: parse_ofx,
+}
+
+
+class StatementImporter:
+    def __init__(self, account, batch_size=DEFAULT_BATCH_SIZE):
+        self.account = account
+        self.batch_size = batch_size
+        self.categories = {
+            name.casefold(): pk
+            for pk, name in Category.objects.filter(owner_id=account.owner_id).values_list('pk', 'name')
+        }
+        self.created = 0
+        self.duplicates = 0
+        self.errors = []
+        self._inserted = set()
+        self._occurrences = Counter()
+
+    def run(self, rows):
+        batch = []
+        for row in rows:
+            if 'error' in row:
+                self.errors.append((row['line'], row['error']))
+                continue
+            batch.append(self.build(row))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self
+
+    def build(self, row):
+        fingerprint = transaction_fingerprint(self.account.pk, row['date'], row['amount'], row['description'])
+        # Одинаковые строки одной выписки различаются номером повторения
+        occurrence = self._occurrences[fingerprint]
+        self._occurrences[fingerprint] += 1
+        return Transaction(
+            owner_id=self.account.owner_id,
+            account_id=self.account.pk,
+            category_id=self.categories.get(row['category'].casefold()),
+            amount=row['amount'],
+            type=row['type'],
+            date=row['date'],
+            description=row['description'],
+            fingerprint=fingerprint,
+            import_key=statement_import_key(fingerprint, occurrence),
+        )
+
+    def flush(self, batch):
+        for attempt in range(CONFLICT_ATTEMPTS):
+            try:
+                fresh = self.insert(batch)
+                break
+            except IntegrityError:
+                # Параллельный импорт того же файла успел вставить часть строк: пачка откатилась целиком,
+                # при повторе эти строки будут видны как уже загруженные
+                if attempt == CONFLICT_ATTEMPTS - 1:
+                    raise
+                for tx in batch:
+                    tx.pk = None
+
+        self._inserted.update(tx.fingerprint for tx in fresh)
+        self.duplicates += len(batch) - len(fresh)
+        self.created += len(fresh)
+
+    def insert(self, batch):
+        with transaction.atomic():
+            rows = set(
+                Transaction.objects
+                .filter(account_id=self.account.pk, fingerprint__in={tx.fingerprint for tx in batch})
+                .values_list('fingerprint', 'import_key')
+            )
+            # Дублями считаются только строки, которые были в базе до начала импорта
+            existing = {fingerprint for fingerprint, _ in rows} - self._inserted
+            taken = {key for _, key in rows}
+            fresh = [tx for tx in batch if tx.fingerprint not in existing and tx.import_key not in taken]
+
+            # Без ignore_conflicts: при конфликте по (счёт, import_key) в ledger не попадут строки, которых
+            # вставила не эта пачка. bulk_create не отправляет сигналы — баланс и агрегаты правятся одной дельтой
+            Transaction.objects.bulk_create(fresh)
+            ledger = LedgerBatch()
+            for tx in fresh:
+                ledger.add(tx.tracked_state())
+            ledger.apply()
+        return fresh
+
+def import_statement(account, stream, fmt, batch_size=DEFAULT_BATCH_SIZE):
+    return StatementImporter(account, batch_size=batch_size).run(PARSERS[fmt](stream))
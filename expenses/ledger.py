@@ -0,0 +1,101 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from .alerts import check_spending
+from .cache import invalidate_user
+from .models import Account, BalanceCheckpoint, DailyBalance, MonthlyRollup, Transaction
+
+_local = threading.local()
+
+
+@contextmanager
+def signals_suppressed():
+    # Массовые операции сами собирают LedgerBatch — сигналы транзакций в этом потоке ничего не делают
+    previous = getattr(_local, 'suppressed', False)
+    _local.suppressed = True
+    try:
+        yield
+    finally:
+        _local.suppressed = previous
+
+
+def signals_enabled():
+    return not getattr(_local, 'suppressed', False)
+
+
+class LedgerBatch:
+    def __init__(self):
+        self.balances = defaultdict(Decimal)
+        self.rollups = defaultdict(lambda: [Decimal('0.00'), 0])
+        self.days = defaultdict(lambda: defaultdict(lambda: [Decimal('0.00'), 0]))
+        self.owners = set()
+        # Изменения уже существовавших транзакций: могут попасть в сверенную часть журнала
+        self.revisions = defaultdict(list)
+
+    def add(self, state, sign=1, existing=False):
+        amount = state['amount'] * sign
+        signed = Transaction.signed_amount(amount, state['type'])
+        self.owners.add(state['owner_id'])
+        self.balances[state['account_id']] += signed
+        if existing:
+            self.revisions[state['account_id']].append((state['id'], signed))
+
+        key = (
+            state['owner_id'], state['account_id'], state['category_id'],
+            state['type'], state['date'].replace(day=1)
+        )
+        rollup = self.rollups[key]
+        rollup[0] += amount
+        rollup[1] += sign
+
+        day = self.days[state['account_id']][state['date']]
+        day[0] += signed
+        day[1] += sign
+
+    def remove(self, state):
+        self.add(state, sign=-1, existing=True)
+
+    def apply(self):
+        with transaction.atomic(savepoint=False):
+            deltas = {account_id: delta for account_id, delta in self.balances.items() if delta}
+            if deltas:
+                # Один UPDATE на все счета пачки: дельта выбирается через CASE по id
+                Account.objects.filter(pk__in=deltas).update(balance=F('balance') + Case(
+                    *(When(pk=account_id, then=Value(delta)) for account_id, delta in deltas.items()),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                ))
+
+            spending = set()
+            for key, (amount, count) in self.rollups.items():
+                if amount or count:
+                    MonthlyRollup.apply_delta(*key, amount, count)
+                owner_id, _, category_id, tr_type, month = key
+                if amount and tr_type == Transaction.TYPE_EXPENSE:
+                    spending.add((owner_id, category_id, month))
+
+            if spending:
+                check_spending(spending)
+
+            for account_id, days in self.days.items():
+                DailyBalance.apply_deltas(account_id, days)
+
+            if self.revisions:
+                self.apply_checkpoints()
+
+        for owner_id in self.owners:
+            invalidate_user(owner_id)
+
+    def apply_checkpoints(self):
+        # Транзакции с id не больше контрольной точки уже вошли в её сумму — правим сумму на дельту
+        for checkpoint in BalanceCheckpoint.objects.filter(account_id__in=self.revisions):
+            delta = sum(
+                signed for tx_id, signed in self.revisions[checkpoint.account_id]
+                if tx_id <= checkpoint.last_transaction_id
+            )
+            if delta:
+                BalanceCheckpoint.objects.filter(pk=checkpoint.pk).update(total=F('total') + delta)
@@ -0,0 +1,173 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from expenses import urls
+from expenses.metrics import percentile
+from expenses.models import Account, Budget, Category, RecurringTransaction, Transaction
+from expenses.synthetic import DEFAULT_PREFIX, SyntheticGenerator
+
+# Страницы, которые нельзя открыть GET-запросом
+SKIP = {'logout', 'notification_read'}
+# Объект для маршрутов с <int:pk> выбирается по префиксу имени
+PK_MODELS = {
+    'account': Account,
+    'transaction': Transaction,
+    'category': Category,
+    'budget': Budget,
+    'recurring': RecurringTransaction,
+}
+EXTRA_QUERIES = {
+    'analytics': ['?granularity=day&periods=31', '?granularity=week&periods=12'],
+    'transaction_list': ['?type=expense', '?q=оплата'],
+    'transaction_export': ['?format=json'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все страницы expenses/urls.py на синтетических данных во временной базе '
+        'и сравнивает число запросов, задержки и пиковую память с сохранённым эталоном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2)
+        parser.add_argument('--transactions', type=int, default=5000, help='Транзакций на пользователя')
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=10, help='Запросов на страницу')
+        parser.add_argument('--warm', action='store_true', help='Не сбрасывать кэш перед каждым запросом')
+        parser.add_argument('--output', help='Куда записать результаты (JSON)')
+        parser.add_argument('--baseline', help='Эталон (JSON) для сравнения')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Допустимый рост задержки и памяти')
+        parser.add_argument('--min-ms', type=float, default=5.0, help='Абсолютный допуск задержки, мс')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline'] and Path(options['baseline']).exists():
+            baseline = json.loads(Path(options['baseline']).read_text(encoding='utf-8'))
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = self.run_suite(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, row in results['views'].items():
+            self.stdout.write(
+                f"{name:<50} {row['status']:>3}  запросов {row['queries']:>3}  "
+                f"p50 {row['p50_ms']:>8.2f} мс  p95 {row['p95_ms']:>8.2f} мс  память {row['peak_kb']:>8.1f} КБ"
+            )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {options['output']}"))
+
+        if baseline is not None:
+            regressions = self.compare(results, baseline, options['threshold'], options['min_ms'])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(line)
+                raise CommandError(f'Регрессий производительности: {len(regressions)}')
+            self.stdout.write(self.style.SUCCESS('Регрессий относительно эталона нет'))
+
+    def run_suite(self, options):
+        end_date = timezone.localdate()
+        generator = SyntheticGenerator(seed=options['seed'], end_date=end_date, months=options['months'])
+        generator.generate(options['users'], options['transactions'])
+
+        user = Account.objects.filter(owner__username__startswith=DEFAULT_PREFIX).order_by('owner__username')[0].owner
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+        client = Client()
+        client.force_login(user)
+
+        views = {}
+        for name, url in self.urls(user):
+            views[name] = self.measure(client, url, options['repeat'], options['warm'])
+
+        return {
+            'meta': {
+                'users': options['users'],
+                'transactions': options['transactions'],
+                'months': options['months'],
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+                'warm': options['warm'],
+            },
+            'views': views,
+        }
+
+    def urls(self, user):
+        for pattern in urls.urlpatterns:
+            if pattern.name in SKIP:
+                continue
+            kwargs = {}
+            if 'pk' in pattern.pattern.converters:
+                model = PK_MODELS[pattern.name.split('_')[0]]
+                kwargs['pk'] = model.objects.filter(owner=user).values_list('pk', flat=True).first()
+            url = reverse(f'{urls.app_name}:{pattern.name}', kwargs=kwargs)
+            yield pattern.name, url
+            for query in EXTRA_QUERIES.get(pattern.name, []):
+                yield f'{pattern.name}{query}', url + query
+
+    def request(self, client, url, warm):
+        if not warm:
+            cache.clear()
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def measure(self, client, url, repeat, warm):
+        # Первый запрос прогревает импорты и шаблоны и в статистику не попадает
+        self.request(client, url, warm)
+
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = self.request(client, url, warm)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured))
+
+        tracemalloc.start()
+        try:
+            self.request(client, url, warm)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': response.status_code,
+            'queries': queries,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def compare(self, results, baseline, threshold, min_ms):
+        regressions = []
+        for name, base in baseline['views'].items():
+            current = results['views'].get(name)
+            if current is None:
+                continue
+            if current['queries'] > base['queries']:
+                regressions.append(f"{name}: запросов {base['queries']} → {current['queries']}")
+            if current['p95_ms'] > base['p95_ms'] * (1 + threshold) + min_ms:
+                regressions.append(f"{name}: p95 {base['p95_ms']:.2f} → {current['p95_ms']:.2f} мс")
+            if current['peak_kb'] > base['peak_kb'] * (1 + threshold) + 64:
+                regressions.append(f"{name}: память {base['peak_kb']:.1f} → {current['peak_kb']:.1f} КБ")
+        return regressions
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, get_internal_wsgi_application
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.testcases import QuietWSGIRequestHandler
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from expenses.metrics import percentile
+from expenses.models import Account
+from expenses.synthetic import DEFAULT_PREFIX, SyntheticGenerator
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+TARGETS = [
+    ('analytics_data', '?granularity=day&periods=31'),
+    ('analytics_data', '?granularity=month&periods=12'),
+    ('budget_data', ''),
+    ('analytics', '?granularity=day&periods=31'),
+]
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержки аналитики и бюджетов при параллельных запросах '
+        'через ASGI (uvicorn) и через текущий WSGI-путь на синтетических данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--transactions', type=int, default=20000, help='Транзакций на пользователя')
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=40, help='Запросов на адрес в каждом режиме')
+        parser.add_argument('--concurrency', type=int, default=8, help='Одновременных запросов')
+        parser.add_argument('--transport', choices=['http', 'client'],
+                            help='http — uvicorn и WSGI-сервер Django, client — обработчики в процессе; '
+                                 'по умолчанию http, если установлен uvicorn')
+        parser.add_argument('--warm', action='store_true', help='Не отключать кэш')
+
+    def handle(self, *args, **options):
+        transport = options['transport'] or ('http' if uvicorn else 'client')
+        if transport == 'http' and uvicorn is None:
+            raise CommandError('Для --transport http нужен uvicorn: pip install uvicorn')
+        if transport == 'client':
+            self.stdout.write(self.style.WARNING('uvicorn не используется: запросы идут через обработчики в процессе'))
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            caches = settings.CACHES if options['warm'] else DUMMY_CACHES
+            with override_settings(CACHES=caches):
+                results = self.run_suite(transport, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, modes in results.items():
+            wsgi, asgi = modes['wsgi'], modes['asgi']
+            self.stdout.write(
+                f"{name:<45} WSGI p50 {wsgi['p50_ms']:>8.1f} p95 {wsgi['p95_ms']:>8.1f} мс   "
+                f"ASGI p50 {asgi['p50_ms']:>8.1f} p95 {asgi['p95_ms']:>8.1f} мс"
+            )
+
+    def run_suite(self, transport, options):
+        generator = SyntheticGenerator(seed=options['seed'], end_date=timezone.localdate(), months=options['months'])
+        generator.generate(options['users'], options['transactions'])
+        user = Account.objects.filter(owner__username__startswith=DEFAULT_PREFIX).order_by('owner__username')[0].owner
+
+        client = Client()
+        client.force_login(user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        runner = self.run_http if transport == 'http' else self.run_client
+
+        results = {}
+        for name, query in TARGETS:
+            url = reverse(f'expenses:{name}') + query
+            results[f'{name}{query}'] = {
+                mode: runner(mode, url, session, options['requests'], options['concurrency'])
+                for mode in ('wsgi', 'asgi')
+            }
+        return results
+
+    def summarize(self, timings):
+        return {
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+        }
+
+    def run_client(self, mode, url, session, requests, concurrency):
+        cookies = {settings.SESSION_COOKIE_NAME: session}
+        if mode == 'asgi':
+            return self.summarize(asyncio.run(self.gather_async(url, cookies, requests, concurrency)))
+
+        def fetch(_):
+            client = Client()
+            client.cookies.load(cookies)
+            started = time.perf_counter()
+            response = client.get(url)
+            self.check_status(response.status_code, url)
+            return (time.perf_counter() - started) * 1000
+
+        return self.summarize(self.in_threads(fetch, requests, concurrency))
+
+    async def gather_async(self, url, cookies, requests, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+        client.cookies.load(cookies)
+
+        async def fetch():
+            async with limit:
+                started = time.perf_counter()
+                response = await client.get(url)
+                self.check_status(response.status_code, url)
+                return (time.perf_counter() - started) * 1000
+
+        await client.get(url)
+        return await asyncio.gather(*(fetch() for _ in range(requests)))
+
+    def run_http(self, mode, url, session, requests, concurrency):
+        server, stop = self.start_asgi() if mode == 'asgi' else self.start_wsgi()
+        try:
+            address = f'http://{server[0]}:{server[1]}{url}'
+            headers = {'Host': 'testserver', 'Cookie': f'{settings.SESSION_COOKIE_NAME}={session}'}
+
+            def fetch(_):
+                started = time.perf_counter()
+                with urllib.request.urlopen(urllib.request.Request(address, headers=headers)) as response:
+                    response.read()
+                    self.check_status(response.status, url)
+                return (time.perf_counter() - started) * 1000
+
+            fetch(None)
+            return self.summarize(self.in_threads(fetch, requests, concurrency))
+        finally:
+            stop()
+
+    def start_wsgi(self):
+        httpd = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+        httpd.set_app(get_internal_wsgi_application())
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            httpd.shutdown()
+            httpd.server_close()
+            thread.join()
+
+        return httpd.server_address, stop
+
+    def start_asgi(self):
+        server = uvicorn.Server(uvicorn.Config(get_asgi_application(), host='127.0.0.1', port=0, log_level='warning'))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        def stop():
+            server.should_exit = True
+            thread.join()
+
+        return server.servers[0].sockets[0].getsockname()[:2], stop
+
+    def in_threads(self, fetch, requests, concurrency):
+        def worker(index):
+            try:
+                return fetch(index)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(worker, range(requests)))
+
+    def check_status(self, status, url):
+        if status != 200:
+            raise CommandError(f'{url}: ответ {status}')
@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import override_settings
+
+from expenses.metrics import percentile
+from expenses.models import Account, Transaction
+
+PROFILES = {
+    'default': ({}, {}),
+    'tuned': (settings.SQLITE_TUNED_OPTIONS, settings.SQLITE_TUNED_PRAGMAS),
+}
+
+
+class Command(BaseCommand):
+    help = 'Измеряет пропускную способность записи SQLite при параллельных писателях для разных профилей настроек'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--per-thread', type=int, default=200, help='Транзакций на поток')
+        parser.add_argument('--profile', choices=sorted(PROFILES), action='append',
+                            help='По умолчанию — все профили')
+        parser.add_argument('--dir', help='Каталог для временной базы; по умолчанию — системный')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite')
+
+        for name in options['profile'] or sorted(PROFILES):
+            result = self.run_profile(name, options['threads'], options['per_thread'], options['dir'])
+            self.stdout.write(
+                f"{name:<8} {result['ops']} записей за {result['seconds']:.2f} с — "
+                f"{result['ops'] / result['seconds']:.0f} в секунду, "
+                f"p95 {result['p95_ms']:.1f} мс, повторов из-за блокировки: {result['locked']}"
+            )
+
+    def run_profile(self, name, threads, per_thread, directory=None):
+        options, pragmas = PROFILES[name]
+        db = connections.settings[connection.alias]
+        saved = {key: db.get(key) for key in ('NAME', 'OPTIONS')}
+        directory = tempfile.mkdtemp(prefix='expenses-bench-', dir=directory)
+
+        # Отдельный файл базы на профиль: режим журнала WAL сохраняется в самом файле
+        connection.close()
+        db['NAME'] = str(Path(directory) / 'bench.sqlite3')
+        db['OPTIONS'] = dict(options)
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                call_command('migrate', verbosity=0, interactive=False)
+                return self.run_writers(threads, per_thread)
+        finally:
+            connection.close()
+            db.update(saved)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run_writers(self, threads, per_thread):
+        user = get_user_model().objects.create(username='bench')
+        account = Account.objects.create(owner=user, name='Общий счёт')
+        lock = threading.Lock()
+        latencies = []
+        errors = []
+        locked = 0
+
+        def writer(index):
+            nonlocal locked
+            retries = 0
+            timings = []
+            try:
+                for _ in range(per_thread):
+                    started = time.perf_counter()
+                    while True:
+                        try:
+                            # Как в представлении: сначала чтение, затем запись в той же транзакции
+                            with transaction.atomic():
+                                Account.objects.get(pk=account.pk)
+                                Transaction.objects.create(
+                                    account_id=account.pk, amount=Decimal('1.00'),
+                                    type=Transaction.TYPE_INCOME if index % 2 else Transaction.TYPE_EXPENSE,
+                                )
+                            break
+                        except OperationalError as exc:
+                            if 'locked' not in str(exc):
+                                raise
+                            retries += 1
+                            time.sleep(0.001)
+                    timings.append((time.perf_counter() - started) * 1000)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(timings)
+                    locked += retries
+
+        workers = [threading.Thread(target=writer, args=(index,)) for index in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        seconds = time.perf_counter() - started
+
+        if errors:
+            raise CommandError(f'Ошибка записи: {errors[0]}')
+
+        incomes = (threads // 2) * per_thread
+        account.refresh_from_db()
+        if account.balance != Decimal(incomes - (threads * per_thread - incomes)):
+            raise CommandError(f'Баланс разошёлся с транзакциями: {account.balance}')
+
+        return {
+            'ops': len(latencies),
+            'seconds': seconds,
+            'p95_ms': percentile(latencies, 95),
+            'locked': locked,
+        }
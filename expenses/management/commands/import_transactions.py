@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.importers import DEFAULT_BATCH_SIZE, PARSERS, import_statement
+from expenses.models import Account
+
+
+class Command(BaseCommand):
+    help = 'Импортирует транзакции из выписки CSV/OFX в указанный счёт'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--account', type=int, required=True, help='ID счёта')
+        parser.add_argument('--format', choices=sorted(PARSERS), help='По умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            account = Account.objects.get(pk=options['account'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Счёт {options['account']} не найден")
+
+        fmt = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if fmt not in PARSERS:
+            raise CommandError(f'Неизвестный формат: {fmt}')
+
+        with open(options['path'], encoding='utf-8-sig', errors='replace', newline='') as stream:
+            result = import_statement(account, stream, fmt, batch_size=options['batch_size'])
+
+        for line, error in result.errors:
+            self.stderr.write(f'строка {line}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено: {result.created}, дублей: {result.duplicates}, ошибок: {len(result.errors)}'
+        ))
@@ -0,0 +1,56 @@
+import csv
+import itertools
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from expenses.currency import base_currency, rates_changed
+from expenses.importers import StatementError, parse_date
+from expenses.models import ExchangeRate
+
+
+class Command(BaseCommand):
+    help = 'Загружает курсы валют из CSV (date,currency,rate) — стоимость единицы валюты в базовой валюте'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        loaded = 0
+        for path in options['paths']:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                rates = list(self.parse(path, stream))
+            with transaction.atomic():
+                ExchangeRate.objects.bulk_create(
+                    rates,
+                    batch_size=options['batch_size'],
+                    update_conflicts=True,
+                    unique_fields=['currency', 'date'],
+                    update_fields=['rate'],
+                )
+            loaded += len(rates)
+
+        rates_changed()
+        self.stdout.write(self.style.SUCCESS(f'Загружено курсов: {loaded} (базовая валюта {base_currency()})'))
+
+    def parse(self, path, stream):
+        header = stream.readline()
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        reader = csv.DictReader(itertools.chain([header], stream), delimiter=delimiter)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+        if not {'date', 'currency', 'rate'} <= set(reader.fieldnames):
+            raise CommandError(f'{path}: нужны колонки date, currency, rate')
+
+        for row in reader:
+            try:
+                day = parse_date(row['date'] or '')
+                rate = Decimal((row['rate'] or '').strip().replace(',', '.'))
+            except (StatementError, InvalidOperation):
+                raise CommandError(f'{path}, строка {reader.line_num}: неверные данные {row}')
+            if rate <= 0:
+                raise CommandError(f'{path}, строка {reader.line_num}: курс должен быть положительным')
+            currency = (row['currency'] or '').strip().upper()
+            if currency != base_currency():
+                yield ExchangeRate(currency=currency, date=day, rate=rate)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from expenses.cache import bump_global_version, invalidate_user
+from expenses.models import Account, DailyBalance
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает дневные итоги балансов счетов (DailyBalance) из транзакций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='ID пользователя; по умолчанию — все пользователи')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Счетов в одной пачке')
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.all()
+        if options['user']:
+            accounts = accounts.filter(owner_id=options['user'])
+
+        ids = list(accounts.order_by('pk').values_list('pk', flat=True))
+        size = max(1, options['chunk_size'])
+        created = sum(DailyBalance.rebuild(ids[start:start + size]) for start in range(0, len(ids), size))
+        # Итоги пересобраны в обход LedgerBatch — кэш сбрасывается явно
+        if options['user']:
+            invalidate_user(options['user'])
+        else:
+            bump_global_version()
+        self.stdout.write(self.style.SUCCESS(f'Создано дневных итогов: {created}'))
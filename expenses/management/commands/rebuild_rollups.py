@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from expenses.cache import bump_global_version, invalidate_user
+from expenses.models import MonthlyRollup, Transaction
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает помесячные агрегаты (MonthlyRollup) из транзакций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='ID пользователя; по умолчанию — все пользователи')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        transactions = Transaction.objects.all()
+        rollups = MonthlyRollup.objects.all()
+        if options['user']:
+            transactions = transactions.filter(owner_id=options['user'])
+            rollups = rollups.filter(owner_id=options['user'])
+
+        rows = (
+            transactions
+            .annotate(month=TruncMonth('date'))
+            .values('owner_id', 'account_id', 'category_id', 'type', 'month')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+
+        with transaction.atomic():
+            rollups.delete()
+            created = MonthlyRollup.objects.bulk_create(
+                (MonthlyRollup(**row) for row in rows.iterator()),
+                batch_size=options['batch_size'],
+            )
+            # Агрегаты пересобраны в обход LedgerBatch — кэш сбрасывается явно
+            if options['user']:
+                invalidate_user(options['user'])
+            else:
+                bump_global_version()
+
+        self.stdout.write(self.style.SUCCESS(f'Создано агрегатов: {len(created)}'))
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from expenses.models import Account
+from expenses.reconciliation import reconcile_accounts, retry_locked
+
+
+class Command(BaseCommand):
+    help = 'Сверяет балансы счетов с журналом транзакций, начиная с последней контрольной точки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='ID пользователя; по умолчанию — все пользователи')
+        parser.add_argument('--fix', action='store_true', help='Исправить расхождения')
+        parser.add_argument('--full', action='store_true', help='Игнорировать контрольные точки и пересчитать всё')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int, default=500, help='Счетов в одной пачке')
+
+    def handle(self, *args, **options):
+        accounts = Account.objects.order_by('pk')
+        if options['user']:
+            accounts = accounts.filter(owner_id=options['user'])
+        ids = list(accounts.values_list('pk', flat=True))
+        size = max(1, options['chunk_size'])
+        chunks = [ids[start:start + size] for start in range(0, len(ids), size)]
+
+        def process(chunk):
+            try:
+                return retry_locked(lambda: reconcile_accounts(chunk, fix=options['fix'], full=options['full']))
+            finally:
+                # Соединения потоков пула не закрываются Django автоматически
+                connection.close()
+
+        started = time.perf_counter()
+        checked = 0
+        drifts = []
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for count, chunk_drifts in pool.map(process, chunks):
+                checked += count
+                drifts.extend(chunk_drifts)
+
+        for drift in sorted(drifts):
+            self.stdout.write(
+                f'Счёт #{drift.account_id} «{drift.name}»: баланс {drift.balance}, '
+                f'по журналу {drift.expected}, расхождение {drift.balance - drift.expected}'
+            )
+
+        summary = f'Проверено счетов: {checked}, расхождений: {len(drifts)} за {time.perf_counter() - started:.1f} с'
+        if drifts and options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'{summary}; исправлено'))
+        elif drifts:
+            self.stdout.write(self.style.WARNING(f'{summary}; запустите с --fix для исправления'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from expenses.reconciliation import retry_locked
+from expenses.recurring import DEFAULT_BATCH_SIZE, materialize_due
+
+
+class Command(BaseCommand):
+    help = 'Создаёт транзакции по регулярным правилам, срок которых наступил; можно запускать каждую минуту'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Последняя дата повторений, YYYY-MM-DD; по умолчанию — сегодня')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Правил в одной транзакции')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = parse_date(options['date'])
+            except ValueError:
+                today = None
+            if today is None:
+                raise CommandError(f"Неверная дата: {options['date']}")
+
+        started = time.perf_counter()
+        rules, created = retry_locked(lambda: materialize_due(today, max(1, options['batch_size'])))
+        self.stdout.write(self.style.SUCCESS(
+            f'Правил обработано: {rules}, транзакций создано: {created} за {time.perf_counter() - started:.2f} с'
+        ))
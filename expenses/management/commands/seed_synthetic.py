@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from expenses.synthetic import DEFAULT_PASSWORD, DEFAULT_PREFIX, SyntheticGenerator
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетических пользователей со счетами, категориями, бюджетами и транзакциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--transactions', type=int, default=1000, help='Транзакций на пользователя')
+        parser.add_argument('--months', type=int, default=12)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--end-date', help='Последний день данных, YYYY-MM-DD; по умолчанию — сегодня')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default=DEFAULT_PREFIX, help='Префикс имён пользователей')
+        parser.add_argument('--clear', action='store_true', help='Сначала удалить пользователей с этим префиксом')
+
+    def handle(self, *args, **options):
+        end_date = timezone.localdate()
+        if options['end_date']:
+            end_date = parse_date(options['end_date'])
+            if end_date is None:
+                raise CommandError(f"Неверная дата: {options['end_date']}")
+        if options['users'] < 1 or options['months'] < 1 or options['transactions'] < 0:
+            raise CommandError('Количество пользователей и месяцев должно быть положительным')
+
+        existing = get_user_model().objects.filter(username__startswith=options['prefix'])
+        if options['clear']:
+            existing.delete()
+        elif existing.exists():
+            raise CommandError(f"Пользователи с префиксом {options['prefix']!r} уже есть — используйте --clear")
+
+        generator = SyntheticGenerator(
+            seed=options['seed'], end_date=end_date, months=options['months'], batch_size=options['batch_size']
+        )
+        started = time.perf_counter()
+        users, transactions = generator.generate(options['users'], options['transactions'], prefix=options['prefix'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {users}, транзакций: {transactions} за {time.perf_counter() - started:.1f} с '
+            f'(пароль: {DEFAULT_PASSWORD})'
+        ))
@@ -0,0 +1,159 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+
+logger = logging.getLogger('expenses.metrics')
+
+SAMPLES_PER_VIEW = 1000
+PERCENTILES = (50, 95, 99)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+def fingerprint(sql):
+    # Один шаблон запроса для разных параметров: N+1 виден как повтор одного отпечатка
+    sql = LITERALS.sub('?', sql)
+    sql = IN_LISTS.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class MetricsStore:
+    def __init__(self, size=SAMPLES_PER_VIEW):
+        self._lock = threading.Lock()
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(lambda: deque(maxlen=self.size))
+            self.duplicates = defaultdict(Counter)
+
+    def record(self, view, sample, duplicates):
+        with self._lock:
+            self.samples[view].append(sample)
+            self.duplicates[view].update(duplicates)
+
+    def summary(self):
+        with self._lock:
+            samples = {view: list(rows) for view, rows in self.samples.items()}
+            duplicates = {view: counter.most_common(3) for view, counter in self.duplicates.items()}
+
+        result = []
+        for view, rows in sorted(samples.items()):
+            entry = {'view': view, 'requests': len(rows), 'duplicates': duplicates.get(view, [])}
+            for metric in ('queries', 'db_ms', 'view_ms'):
+                values = [row[metric] for row in rows]
+                for pct in PERCENTILES:
+                    entry[f'{metric}_p{pct}'] = percentile(values, pct)
+            result.append(entry)
+        return result
+
+
+store = MetricsStore()
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        self.record(request, response, recorder, start)
+        return response
+
+    async def __acall__(self, request):
+        # Под ASGI запросы к базе идут в потоке sync_to_async(thread_sensitive=True) со своим соединением —
+        # обёртка ставится на соединение этого потока
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        await sync_to_async(lambda: connection.execute_wrappers.append(recorder))()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(lambda: connection.execute_wrappers.remove(recorder))()
+        self.record(request, response, recorder, start)
+        return response
+
+    def record(self, request, response, recorder, start):
+        view_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        if match is None:
+            return
+
+        view = match.view_name
+        sample = {
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 2),
+            'view_ms': round(view_ms, 2),
+        }
+        duplicates = recorder.duplicates
+        store.record(view, sample, duplicates)
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'status': response.status_code,
+            **sample,
+            'duplicates': sorted(duplicates.values(), reverse=True)[:5],
+        }))
+
+
+@receiver(setting_changed)
+def metrics_log_changed(setting, value, **kwargs):
+    # LOGGING применяется один раз при старте; override_settings(METRICS_LOG=...) перенаправляет уже созданный
+    # обработчик — файл открывается заново при следующей записи (delay=True)
+    if setting != 'METRICS_LOG':
+        return
+    for handler in logger.handlers:
+        if isinstance(handler, logging.FileHandler):
+            handler.close()
+            handler.baseFilename = os.path.abspath(value)
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:12
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_rollups(apps, schema_editor):
+    Transaction = apps.get_model('expenses', 'Transaction')
+    MonthlyRollup = apps.get_model('expenses', 'MonthlyRollup')
+    rows = (
+        Transaction.objects
+        .annotate(month=TruncMonth('date'))
+        .values('account_id', 'category_id', 'type', 'month', owner_id=F('account__owner_id'))
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    MonthlyRollup.objects.bulk_create((MonthlyRollup(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_alter_category_unique_together_remove_category_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('income', 'Доход'), ('expense', 'Расход')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('income', 'Доход'), ('expense', 'Расход')], max_length=10)),
+                ('month', models.DateField(help_text='Первый день месяца')),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='expenses.account')),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rollups', to='expenses.category')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('owner', 'account', 'category', 'type', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
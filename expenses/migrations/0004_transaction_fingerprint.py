@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:17
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def transaction_fingerprint(account_id, date, amount, description):
+    # Копия expenses.models.transaction_fingerprint на момент миграции
+    raw = f"{account_id}|{date:%Y-%m-%d}|{Decimal(amount):.2f}|{(description or '').strip()}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def populate_fingerprints(apps, schema_editor):
+    Transaction = apps.get_model('expenses', 'Transaction')
+    batch = []
+    for tx in Transaction.objects.only('id', 'account_id', 'date', 'amount', 'description').iterator(chunk_size=1000):
+        tx.fingerprint = transaction_fingerprint(tx.account_id, tx.date, tx.amount, tx.description)
+        batch.append(tx)
+        if len(batch) >= 1000:
+            Transaction.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    Transaction.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_monthlyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(populate_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0004_transaction_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlyrollup',
+            index=models.Index(fields=['owner', 'month'], name='rollup_owner_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlyrollup',
+            index=models.Index(fields=['category', 'type', 'month'], name='rollup_category_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'date', 'created_at'], name='tx_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['category', 'type', 'date'], name='tx_category_type_date_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_owner(apps, schema_editor):
+    Account = apps.get_model('expenses', 'Account')
+    Transaction = apps.get_model('expenses', 'Transaction')
+    Transaction.objects.update(
+        owner_id=Subquery(Account.objects.filter(pk=OuterRef('account_id')).values('owner_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0005_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='owner',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(populate_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='transaction',
+            name='owner',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['owner', 'date', 'created_at'], name='tx_owner_date_idx'),
+        ),
+    ]
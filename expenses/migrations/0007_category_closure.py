@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_closure(apps, schema_editor):
+    Category = apps.get_model('expenses', 'Category')
+    CategoryClosure = apps.get_model('expenses', 'CategoryClosure')
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+
+    links = []
+    for pk in parents:
+        ancestor_id, depth, seen = pk, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            links.append(CategoryClosure(ancestor_id=ancestor_id, descendant_id=pk, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    CategoryClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_transaction_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='expenses.category')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='expenses.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'ancestor'], name='closure_descendant_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:36
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def populate_opening_balance(apps, schema_editor):
+    # Текущий баланс считается верным: начальный остаток — то, что не объясняется транзакциями
+    Account = apps.get_model('expenses', 'Account')
+    Transaction = apps.get_model('expenses', 'Transaction')
+    totals = {
+        row['account_id']: (row['income'] or Decimal('0.00')) - (row['expense'] or Decimal('0.00'))
+        for row in Transaction.objects.values('account_id').annotate(
+            income=Sum('amount', filter=Q(type='income')),
+            expense=Sum('amount', filter=Q(type='expense')),
+        ).order_by()
+    }
+    accounts = list(Account.objects.all())
+    for account in accounts:
+        account.opening_balance = account.balance - totals.get(account.pk, Decimal('0.00'))
+    Account.objects.bulk_update(accounts, ['opening_balance'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0007_category_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.RunPython(populate_opening_balance, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_id', models.BigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('checked_at', models.DateTimeField(auto_now=True)),
+                ('account', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint', to='expenses.account')),
+            ],
+        ),
+    ]
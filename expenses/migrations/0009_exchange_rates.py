@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:39
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_balance_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18, validators=[django.core.validators.MinValueValidator(Decimal('1E-8'))])),
+            ],
+            options={
+                'ordering': ['currency', '-date'],
+                'unique_together': {('currency', 'date')},
+            },
+        ),
+    ]
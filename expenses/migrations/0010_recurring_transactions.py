@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:47
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0009_exchange_rates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='occurrence_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='RecurringTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('type', models.CharField(choices=[('income', 'Доход'), ('expense', 'Расход')], max_length=10)),
+                ('description', models.TextField(blank=True)),
+                ('frequency', models.CharField(choices=[('daily', 'Ежедневно'), ('weekly', 'Еженедельно'), ('monthly', 'Ежемесячно'), ('yearly', 'Ежегодно')], default='monthly', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Повторять каждый N-й период', validators=[django.core.validators.MinValueValidator(1)])),
+                ('start_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('next_run', models.DateField(editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_transactions', to='expenses.account')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_transactions', to='expenses.category')),
+                ('owner', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='recurring_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['next_run', 'pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='recurring_rule',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='expenses.recurringtransaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('recurring_rule', 'occurrence_date'), name='tx_recurring_occurrence_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringtransaction',
+            index=models.Index(fields=['next_run'], name='recurring_next_run_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+# Индекс FTS5 по описанию транзакции и названиям её категории и счёта; rowid = id транзакции.
+# Триггеры держат его в актуальном состоянии при любых записях, включая bulk_create и QuerySet.update.
+ROW_VALUES = """
+    (SELECT name FROM expenses_category WHERE id = NEW.category_id),
+    (SELECT name FROM expenses_account WHERE id = NEW.account_id)
+"""
+
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE expenses_transaction_fts USING fts5(
+        description, category, account, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER expenses_transaction_fts_insert AFTER INSERT ON expenses_transaction BEGIN
+        INSERT INTO expenses_transaction_fts (rowid, description, category, account)
+        VALUES (NEW.id, NEW.description, {ROW_VALUES});
+    END
+    """,
+    f"""
+    CREATE TRIGGER expenses_transaction_fts_update
+    AFTER UPDATE OF description, category_id, account_id ON expenses_transaction BEGIN
+        DELETE FROM expenses_transaction_fts WHERE rowid = OLD.id;
+        INSERT INTO expenses_transaction_fts (rowid, description, category, account)
+        VALUES (NEW.id, NEW.description, {ROW_VALUES});
+    END
+    """,
+    """
+    CREATE TRIGGER expenses_transaction_fts_delete AFTER DELETE ON expenses_transaction BEGIN
+        DELETE FROM expenses_transaction_fts WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER expenses_category_fts_rename AFTER UPDATE OF name ON expenses_category BEGIN
+        UPDATE expenses_transaction_fts SET category = NEW.name
+        WHERE rowid IN (SELECT id FROM expenses_transaction WHERE category_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER expenses_account_fts_rename AFTER UPDATE OF name ON expenses_account BEGIN
+        UPDATE expenses_transaction_fts SET account = NEW.name
+        WHERE rowid IN (SELECT id FROM expenses_transaction WHERE account_id = NEW.id);
+    END
+    """,
+    """
+    INSERT INTO expenses_transaction_fts (rowid, description, category, account)
+    SELECT t.id, t.description, c.name, a.name
+    FROM expenses_transaction t
+    JOIN expenses_account a ON a.id = t.account_id
+    LEFT JOIN expenses_category c ON c.id = t.category_id
+    """,
+]
+
+DROP = [
+    'DROP TRIGGER IF EXISTS expenses_account_fts_rename',
+    'DROP TRIGGER IF EXISTS expenses_category_fts_rename',
+    'DROP TRIGGER IF EXISTS expenses_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS expenses_transaction_fts_update',
+    'DROP TRIGGER IF EXISTS expenses_transaction_fts_insert',
+    'DROP TABLE IF EXISTS expenses_transaction_fts',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        # На других СУБД поиск работает через icontains (expenses/search.py)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_recurring_transactions'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
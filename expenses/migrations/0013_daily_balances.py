@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:06
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_daily_balances(apps, schema_editor):
+    Transaction = apps.get_model('expenses', 'Transaction')
+    DailyBalance = apps.get_model('expenses', 'DailyBalance')
+    rows = (
+        Transaction.objects
+        .values('account_id', 'date')
+        .annotate(
+            income=Sum('amount', filter=Q(type='income')),
+            expense=Sum('amount', filter=Q(type='expense')),
+            count=Count('id'),
+        )
+        .order_by('account_id', 'date')
+    )
+
+    def balances():
+        account_id, total = None, Decimal('0.00')
+        for row in rows.iterator():
+            if row['account_id'] != account_id:
+                account_id, total = row['account_id'], Decimal('0.00')
+            change = ((row['income'] or Decimal('0.00')) - (row['expense'] or Decimal('0.00'))).quantize(Decimal('0.01'))
+            total += change
+            yield DailyBalance(account_id=account_id, date=row['date'], change=change, total=total, count=row['count'])
+
+    DailyBalance.objects.bulk_create(balances(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0012_budget_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('change', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='expenses.account')),
+            ],
+            options={
+                'ordering': ['account', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('account', 'date'), name='daily_balance_account_date_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_daily_balances, migrations.RunPython.noop),
+    ]
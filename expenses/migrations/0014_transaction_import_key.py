@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0013_daily_balances'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='import_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('import_key__isnull', False)), fields=('account', 'import_key'), name='tx_account_import_key_uniq'),
+        ),
+    ]
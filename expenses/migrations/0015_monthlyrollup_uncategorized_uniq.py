@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:27
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_uncategorized(apps, schema_editor):
+    # До ограничения могли появиться несколько строк "без категории" на один ключ — сливаем их в одну
+    MonthlyRollup = apps.get_model('expenses', 'MonthlyRollup')
+    groups = (
+        MonthlyRollup.objects
+        .filter(category__isnull=True)
+        .values('owner_id', 'account_id', 'type', 'month')
+        .annotate(rows=Count('id'), keep=Min('id'), total_sum=Sum('total'), count_sum=Sum('count'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in groups:
+        duplicates = MonthlyRollup.objects.filter(
+            category__isnull=True, owner_id=group['owner_id'], account_id=group['account_id'],
+            type=group['type'], month=group['month'],
+        )
+        duplicates.exclude(pk=group['keep']).delete()
+        duplicates.update(total=group['total_sum'].quantize(Decimal('0.01')), count=group['count_sum'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0014_transaction_import_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_uncategorized, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='monthlyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('owner', 'account', 'type', 'month'), name='rollup_uncategorized_uniq'),
+        ),
+    ]
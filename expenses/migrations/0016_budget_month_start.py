@@ -0,0 +1,42 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def normalize_budget_months(apps, schema_editor):
+    # Бюджеты, созданные не с первого числа, переносятся на начало месяца.
+    # Несколько бюджетов одной категории на один месяц сливаются в последний созданный
+    Budget = apps.get_model('expenses', 'Budget')
+    Notification = apps.get_model('expenses', 'Notification')
+
+    groups = defaultdict(list)
+    for budget in Budget.objects.filter(period_start__day__gt=1).order_by('pk'):
+        groups[(budget.owner_id, budget.category_id, budget.period_start.replace(day=1))].append(budget)
+
+    for (owner_id, category_id, month), budgets in groups.items():
+        existing = Budget.objects.filter(owner_id=owner_id, category_id=category_id, period_start=month).first()
+        if existing is not None:
+            budgets = sorted([existing, *budgets], key=lambda budget: budget.pk)
+        keep, merged = budgets[-1], budgets[:-1]
+        if merged:
+            ids = [budget.pk for budget in merged]
+            Notification.objects.filter(budget_id__in=ids).update(budget_id=keep.pk)
+            keep.last_alert_threshold = max(
+                keep.last_alert_threshold,
+                Budget.objects.filter(pk__in=ids).aggregate(threshold=Max('last_alert_threshold'))['threshold'],
+            )
+            Budget.objects.filter(pk__in=ids).delete()
+        keep.period_start = month
+        keep.save(update_fields=['period_start', 'last_alert_threshold'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0015_monthlyrollup_uncategorized_uniq'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_budget_months, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,15 @@
+import hashlib
+from datetime import datetime, time
 from decimal import Decimal
+from dateutil import rrule
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction as db_transaction
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
+from django.db.models import Case, Count, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils.functional import cached_property
 
 User = settings.AUTH_USER_MODEL
 
@@ -13,14 +18,55 @@ class Account(models.Model):
     name = models.CharField(max_length=120)
     currency = models.CharField(max_length=3, default='RUB')
     balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Баланс без учёта транзакций: balance = opening_balance + сумма транзакций
+    opening_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    _loaded_balance = None
+
     class Meta:
         ordering = ['-created_at']
 
     def __str__(self):
         return f"{self.name} ({self.currency})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'balance' in field_names:
+            instance._loaded_balance = instance.balance
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Баланс, введённый вручную, — это корректировка начального остатка
+        if self._state.adding or self._loaded_balance is None:
+            if self._state.adding:
+                self.opening_balance = self.balance
+            super().save(*args, **kwargs)
+            self._loaded_balance = self.balance
+            return
+        # Баланс могли изменить транзакции после загрузки счёта, поэтому его не перезаписываем,
+        # а применяем только разницу с загруженным значением
+        update_fields = kwargs.pop('update_fields', None)
+        if update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+            ]
+        delta = self.balance - self._loaded_balance if 'balance' in update_fields else 0
+        fields = [name for name in update_fields if name not in ('balance', 'opening_balance')]
+        with db_transaction.atomic():
+            if fields:
+                super().save(*args, update_fields=fields, **kwargs)
+            if delta:
+                Account.objects.filter(pk=self.pk).update(
+                    balance=F('balance') + delta, opening_balance=F('opening_balance') + delta
+                )
+        if delta:
+            self.refresh_from_db(fields=['balance', 'opening_balance'])
+        self._loaded_balance = self.balance
+
 class Category(models.Model):
     owner = models.ForeignKey(
         User,
@@ -36,6 +82,8 @@ class Category(models.Model):
         related_name='children'
     )
 
+    _loaded_parent_id = None
+
     class Meta:
         unique_together = ('owner', 'name')
         ordering = ['name']
@@ -43,6 +91,95 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'parent_id' in field_names:
+            instance._loaded_parent_id = instance.parent_id
+        return instance
+
+    def clean(self):
+        if self.parent_id is None:
+            return
+        if self.owner_id and self.parent.owner_id != self.owner_id:
+            raise ValidationError({'parent': 'Родительская категория принадлежит другому пользователю'})
+        if self.pk and self.parent_id in CategoryClosure.subtree_ids(self.pk):
+            raise ValidationError({'parent': 'Категория не может быть вложена в саму себя или в свою подкатегорию'})
+
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            adding = self._state.adding
+            moved = False
+            if not adding:
+                old_parent_id = self._loaded_parent_id
+                if old_parent_id is None:
+                    old_parent_id = Category.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+                moved = old_parent_id != self.parent_id
+                if moved and self.parent_id in CategoryClosure.subtree_ids(self.pk):
+                    raise ValidationError({'parent': 'Категория не может быть вложена в саму себя или в свою подкатегорию'})
+
+            super().save(*args, **kwargs)
+
+            if adding:
+                CategoryClosure.attach_subtree(self)
+            elif moved:
+                CategoryClosure.detach_subtree(self)
+                CategoryClosure.attach_subtree(self)
+        self._loaded_parent_id = self.parent_id
+
+
+class CategoryClosure(models.Model):
+    # Все пары (предок, потомок) дерева категорий, включая саму категорию с depth=0
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['descendant', 'ancestor'], name='closure_descendant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id} ({self.depth})"
+
+    @classmethod
+    def subtree_ids(cls, category_id):
+        return set(cls.objects.filter(ancestor_id=category_id).values_list('descendant_id', flat=True))
+
+    @classmethod
+    def attach_subtree(cls, category):
+        # Новые связи: каждый предок нового родителя × каждый узел поддерева
+        subtree = list(cls.objects.filter(ancestor_id=category.pk).values_list('descendant_id', 'depth'))
+        if not subtree:
+            subtree = [(category.pk, 0)]
+            cls.objects.create(ancestor_id=category.pk, descendant_id=category.pk, depth=0)
+        if category.parent_id is None:
+            return
+
+        ancestors = cls.objects.filter(descendant_id=category.parent_id).values_list('ancestor_id', 'depth')
+        cls.objects.bulk_create([
+            cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+            for ancestor_id, up in ancestors
+            for descendant_id, down in subtree
+        ])
+
+    @classmethod
+    def detach_subtree(cls, category):
+        # Рвём связи поддерева со всеми предками категории; внутренние связи поддерева остаются
+        subtree = cls.objects.filter(ancestor_id=category.pk).values('descendant_id')
+        ancestors = cls.objects.filter(descendant_id=category.pk, depth__gt=0).values('ancestor_id')
+        cls.objects.filter(descendant_id__in=subtree, ancestor_id__in=ancestors).delete()
+
+def transaction_fingerprint(account_id, date, amount, description):
+    raw = f"{account_id}|{date:%Y-%m-%d}|{Decimal(amount):.2f}|{(description or '').strip()}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def statement_import_key(fingerprint, occurrence):
+    return hashlib.sha256(f'{fingerprint}|{occurrence}'.encode('utf-8')).hexdigest()
+
+
 class Transaction(models.Model):
     TYPE_INCOME = 'income'
     TYPE_EXPENSE = 'expense'
@@ -51,6 +188,13 @@ class Transaction(models.Model):
         (TYPE_EXPENSE, 'Расход'),
     ]
 
+    # Копия account.owner: проверки доступа и агрегаты обходятся без JOIN со счётом
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='transactions',
+        editable=False
+    )
     account = models.ForeignKey(
         Account,
         on_delete=models.CASCADE,
@@ -74,22 +218,244 @@ class Transaction(models.Model):
     date = models.DateField(default=timezone.now)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Хеш (счёт, дата, сумма, описание) для поиска дублей при импорте выписок
+    fingerprint = models.CharField(max_length=64, db_index=True, editable=False, blank=True)
+    # Ключ строки выписки: хеш отпечатка и номера одинаковой строки в выписке. Уникален в пределах счёта,
+    # поэтому параллельные импорты одного файла не вставят строку дважды; у транзакций не из импорта — NULL
+    import_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    # Для транзакций, созданных по регулярному правилу: правило и дата повторения
+    recurring_rule = models.ForeignKey(
+        'RecurringTransaction',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transactions',
+        editable=False
+    )
+    occurrence_date = models.DateField(null=True, blank=True, editable=False)
+
+    # Поля, от которых зависят баланс счёта и агрегаты
+    TRACKED_FIELDS = ('id', 'owner_id', 'account_id', 'category_id', 'amount', 'type', 'date')
+
+    _loaded_state = None
 
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'date', 'created_at'], name='tx_owner_date_idx'),
+            models.Index(fields=['account', 'date', 'created_at'], name='tx_account_date_idx'),
+            models.Index(fields=['category', 'type', 'date'], name='tx_category_type_date_idx'),
+        ]
+        constraints = [
+            # Повторный запуск планировщика не создаст одно повторение дважды
+            models.UniqueConstraint(fields=['recurring_rule', 'occurrence_date'], name='tx_recurring_occurrence_uniq'),
+            # Частичный индекс: на SQLite создаётся без пересборки таблицы, и триггеры поиска (0011) сохраняются
+            models.UniqueConstraint(
+                fields=['account', 'import_key'], condition=Q(import_key__isnull=False), name='tx_account_import_key_uniq'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.date} — {self.amount} {self.account.currency}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in instance.__dict__ for name in cls.TRACKED_FIELDS):
+            instance._loaded_state = instance.tracked_state()
+        return instance
+
+    @staticmethod
+    def signed_amount(amount, tr_type):
+        return amount if tr_type == Transaction.TYPE_INCOME else -amount
+
+    def tracked_state(self):
+        return {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+    def save(self, *args, **kwargs):
+        # Дата и сумма могут прийти строкой ('2026-03-01', '10.50') или datetime,
+        # а хеш и ledger работают с date и Decimal
+        for name in ('date', 'amount'):
+            setattr(self, name, self._meta.get_field(name).to_python(getattr(self, name)))
+        loaded_account_id = self._loaded_state['account_id'] if self._loaded_state else None
+        if self.owner_id is None or self.account_id != loaded_account_id:
+            self.owner_id = self.account.owner_id
+        if self._loaded_state and self.account_id != loaded_account_id:
+            # Ключ строки выписки относится к счёту, на который её импортировали
+            self.import_key = None
+        self.fingerprint = transaction_fingerprint(self.account_id, self.date, self.amount, self.description)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'owner', 'fingerprint', 'import_key'}
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_state = self.tracked_state()
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            return super().delete(*args, **kwargs)
+
     def clean(self):
         return super().clean()
 
 
+class RecurringTransaction(models.Model):
+    FREQ_DAILY = 'daily'
+    FREQ_WEEKLY = 'weekly'
+    FREQ_MONTHLY = 'monthly'
+    FREQ_YEARLY = 'yearly'
+    FREQUENCY_CHOICES = [
+        (FREQ_DAILY, 'Ежедневно'),
+        (FREQ_WEEKLY, 'Еженедельно'),
+        (FREQ_MONTHLY, 'Ежемесячно'),
+        (FREQ_YEARLY, 'Ежегодно'),
+    ]
+    RRULE_FREQUENCIES = {
+        FREQ_DAILY: rrule.DAILY,
+        FREQ_WEEKLY: rrule.WEEKLY,
+        FREQ_MONTHLY: rrule.MONTHLY,
+        FREQ_YEARLY: rrule.YEARLY,
+    }
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_transactions', editable=False)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='recurring_transactions')
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='recurring_transactions'
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
+    type = models.CharField(max_length=10, choices=Transaction.TYPE_CHOICES)
+    description = models.TextField(blank=True)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default=FREQ_MONTHLY)
+    interval = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text='Повторять каждый N-й период'
+    )
+    start_date = models.DateField(default=timezone.localdate)
+    end_date = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    # Ближайшее ещё не созданное повторение; None — правило приостановлено или закончилось
+    next_run = models.DateField(null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['next_run', 'pk']
+        indexes = [
+            models.Index(fields=['next_run'], name='recurring_next_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_frequency_display()} — {self.amount} {self.account.currency}"
+
+    def clean(self):
+        if self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': 'Дата окончания раньше даты начала'})
+
+    def schedule(self):
+        options = {}
+        if self.frequency == self.FREQ_MONTHLY and self.start_date.day > 28:
+            # 29–31 число в коротких месяцах переносится на последний день месяца
+            options = {'bymonthday': (self.start_date.day, -1), 'bysetpos': 1}
+        return rrule.rrule(
+            self.RRULE_FREQUENCIES[self.frequency],
+            interval=self.interval,
+            dtstart=datetime.combine(self.start_date, time()),
+            until=datetime.combine(self.end_date, time()) if self.end_date else None,
+            **options
+        )
+
+    def occurrences(self, date_from, date_to):
+        return [
+            moment.date() for moment in
+            self.schedule().between(datetime.combine(date_from, time()), datetime.combine(date_to, time()), inc=True)
+        ]
+
+    def next_occurrence(self, after=None):
+        if after is None:
+            moment = self.schedule().after(datetime.combine(self.start_date, time()), inc=True)
+        else:
+            moment = self.schedule().after(datetime.combine(after, time()))
+        return moment.date() if moment else None
+
+    def build_transaction(self, day):
+        return Transaction(
+            owner_id=self.owner_id,
+            account_id=self.account_id,
+            category_id=self.category_id,
+            amount=self.amount,
+            type=self.type,
+            date=day,
+            description=self.description,
+            recurring_rule_id=self.pk,
+            occurrence_date=day,
+            fingerprint=transaction_fingerprint(self.account_id, day, self.amount, self.description),
+        )
+
+    def save(self, *args, **kwargs):
+        self.owner_id = self.account.owner_id
+        if not self.is_active:
+            self.next_run = None
+        else:
+            # После правки расписания продолжаем с повторения, следующего за последним созданным
+            last = self.transactions.aggregate(last=Max('occurrence_date'))['last'] if self.pk else None
+            self.next_run = self.next_occurrence(after=last)
+        super().save(*args, **kwargs)
+
+
+class BudgetQuerySet(models.QuerySet):
+    def with_spent(self):
+        spent = (
+            MonthlyRollup.objects
+            .filter(
+                category__ancestor_links__ancestor=OuterRef('category'),
+                type=Transaction.TYPE_EXPENSE,
+                month=OuterRef('period_start')
+            )
+            .order_by()
+            .values('category__ancestor_links__ancestor')
+            .annotate(total=Sum(converted('total', date_ref='month')))
+            .values('total')
+        )
+        return self.annotate(
+            spent=Coalesce(
+                Subquery(spent, output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+                Decimal('0.00'),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2)
+            )
+        )
+
+    def with_spending(self):
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+        return self.with_spent().annotate(
+            remaining=Greatest(
+                ExpressionWrapper(F('limit_amount') - F('spent'), output_field=money),
+                Value(Decimal('0.00')),
+                output_field=money
+            ),
+            over_limit=ExpressionWrapper(Q(spent__gt=F('limit_amount')), output_field=models.BooleanField()),
+            percent=Case(
+                When(limit_amount=0, then=Value(0.0)),
+                default=Least(
+                    ExpressionWrapper(F('spent') * 100.0 / F('limit_amount'), output_field=models.FloatField()),
+                    Value(100.0)
+                ),
+                output_field=models.FloatField()
+            )
+        )
+
+
 class Budget(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='budgets')
     period_start = models.DateField(help_text='Первый день месяца')
     limit_amount = models.DecimalField(max_digits=12, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
+    # Последний достигнутый порог уведомлений, % (0 — ни одного); см. expenses/alerts.py
+    last_alert_threshold = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = BudgetQuerySet.as_manager()
 
     class Meta:
         unique_together = ('owner', 'category', 'period_start')
@@ -98,17 +464,26 @@ class Budget(models.Model):
     def __str__(self):
         return f"{self.category.name} — {self.period_start:%Y-%m} — {self.limit_amount}"
 
-    @property
+    def save(self, *args, **kwargs):
+        self.period_start = self._meta.get_field('period_start').to_python(self.period_start).replace(day=1)
+        super().save(*args, **kwargs)
+
+    @cached_property
     def spent_amount(self):
-        period_end = self.period_start.replace(day=28) + timezone.timedelta(days=4)
-        period_end = period_end.replace(day=1) - timezone.timedelta(days=1)
+        # Значение, посчитанное в запросе через BudgetQuerySet.with_spent()
+        if hasattr(self, 'spent'):
+            return self.spent
 
-        total = Transaction.objects.filter(
-            category=self.category,
+        total = self.spent_queryset().aggregate(total=Sum(converted('total', date_ref='month')))['total']
+        return (total or Decimal('0.00')).quantize(Decimal('0.01'))
+
+    def spent_queryset(self):
+        # Бюджет родительской категории учитывает расходы всех подкатегорий
+        return MonthlyRollup.objects.filter(
+            category__ancestor_links__ancestor_id=self.category_id,
             type=Transaction.TYPE_EXPENSE,
-            date__range=[self.period_start, period_end]
-        ).aggregate(Sum('amount'))['amount__sum'] or Decimal('0.00')
-        return total
+            month=self.period_start.replace(day=1)
+        )
 
     @property
     def remaining_amount(self):
@@ -125,54 +500,288 @@ class Budget(models.Model):
         return min(100, (self.spent_amount / self.limit_amount * 100))
 
 
+class Notification(models.Model):
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='notifications')
+    threshold = models.PositiveSmallIntegerField()
+    # Состояние бюджета в момент срабатывания
+    spent = models.DecimalField(max_digits=14, decimal_places=2)
+    limit_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-pk']
+        indexes = [
+            models.Index(fields=['owner', 'read_at'], name='notification_owner_read_idx'),
+            models.Index(fields=['owner', '-created_at'], name='notification_owner_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.budget} — {self.threshold}%"
+
+    @property
+    def is_over_limit(self):
+        return self.spent > self.limit_amount
+
+
+class ExchangeRate(models.Model):
+    # Стоимость одной единицы валюты в базовой валюте (settings.BASE_CURRENCY) на дату
+    currency = models.CharField(max_length=3)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=18, decimal_places=8, validators=[MinValueValidator(Decimal('0.00000001'))])
+
+    class Meta:
+        unique_together = ('currency', 'date')
+        ordering = ['currency', '-date']
+
+    def __str__(self):
+        return f"{self.currency} {self.date}: {self.rate}"
+
+
+class BalanceCheckpoint(models.Model):
+    # Сумма транзакций счёта с id <= last_transaction_id на момент последней сверки
+    account = models.OneToOneField(Account, on_delete=models.CASCADE, related_name='checkpoint')
+    last_transaction_id = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    checked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.account_id} до #{self.last_transaction_id}: {self.total}"
+
+
+class MonthlyRollup(models.Model):
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_rollups')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='rollups')
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='rollups'
+    )
+    type = models.CharField(max_length=10, choices=Transaction.TYPE_CHOICES)
+    month = models.DateField(help_text='Первый день месяца')
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('owner', 'account', 'category', 'type', 'month')
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['owner', 'month'], name='rollup_owner_month_idx'),
+            models.Index(fields=['category', 'type', 'month'], name='rollup_category_month_idx'),
+        ]
+        constraints = [
+            # unique_together не срабатывает для category = NULL (NULL не равен NULL) — строки "без категории"
+            # защищены отдельным частичным индексом
+            models.UniqueConstraint(
+                fields=['owner', 'account', 'type', 'month'],
+                condition=Q(category__isnull=True),
+                name='rollup_uncategorized_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.account.name} — {self.month:%Y-%m} — {self.type} — {self.total}"
+
+    @classmethod
+    def apply_delta(cls, owner_id, account_id, category_id, tr_type, day, amount, count):
+        key = {
+            'owner_id': owner_id,
+            'account_id': account_id,
+            'category_id': category_id,
+            'type': tr_type,
+            'month': day.replace(day=1),
+        }
+        changes = {'total': F('total') + amount, 'count': F('count') + count}
+        if cls.objects.filter(**key).update(**changes):
+            return
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(total=amount, count=count, **key)
+        except IntegrityError:
+            cls.objects.filter(**key).update(**changes)
+
 
-from django.db.models.signals import pre_save, post_save, post_delete
+class DailyBalance(models.Model):
+    # Итог дня по счёту — только дни, в которые были транзакции.
+    # total — сумма транзакций счёта по этот день включительно; баланс на дату = opening_balance + total
+    REBUILD_DAYS = 64
+
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='daily_balances')
+    date = models.DateField()
+    change = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['account', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='daily_balance_account_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} — {self.date:%Y-%m-%d} — {self.total}"
+
+    @classmethod
+    def apply_deltas(cls, account_id, days):
+        # days — {дата: [изменение баланса, изменение числа транзакций]}
+        days = sorted((day, amount, count) for day, (amount, count) in days.items() if amount or count)
+        if not days:
+            return
+        if len(days) > cls.REBUILD_DAYS:
+            # Пачки на много дней (импорт, генерация данных) дешевле пересобрать одним агрегатом
+            cls.rebuild([account_id])
+            return
+
+        rows = cls.objects.filter(account_id=account_id)
+        first, last = days[0][0], days[-1][0]
+
+        # Новые дни получают итог предыдущего дня, дальше их сдвигает общий UPDATE
+        previous = rows.filter(date__lt=first).order_by('-date').values_list('total', flat=True).first()
+        carried = previous if previous is not None else Decimal('0.00')
+        known = list(rows.filter(date__range=(first, last)).order_by('date').values_list('date', 'total'))
+        known_days = {day for day, _ in known}
+        missing = []
+        position = 0
+        for day, _, _ in days:
+            while position < len(known) and known[position][0] <= day:
+                carried = known[position][1]
+                position += 1
+            if day not in known_days:
+                missing.append(cls(account_id=account_id, date=day, total=carried))
+        cls.objects.bulk_create(missing, ignore_conflicts=True)
+
+        # Один UPDATE по диапазону дат: каждый день сдвигается на сумму изменений до него включительно
+        shifts = []
+        running = Decimal('0.00')
+        for day, amount, _ in days:
+            running += amount
+            shifts.append(When(date__gte=day, then=Value(running)))
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+        rows.filter(date__gte=first).update(
+            total=F('total') + Case(*reversed(shifts), output_field=money),
+            change=F('change') + Case(
+                *(When(date=day, then=Value(amount)) for day, amount, _ in days),
+                default=Value(Decimal('0.00')), output_field=money,
+            ),
+            count=F('count') + Case(
+                *(When(date=day, then=Value(count)) for day, _, count in days),
+                default=Value(0), output_field=models.IntegerField(),
+            ),
+        )
+
+    @classmethod
+    def rebuild(cls, account_ids):
+        rows = (
+            Transaction.objects
+            .filter(account_id__in=account_ids)
+            .values('account_id', 'date')
+            .annotate(
+                income=Sum('amount', filter=Q(type=Transaction.TYPE_INCOME)),
+                expense=Sum('amount', filter=Q(type=Transaction.TYPE_EXPENSE)),
+                count=Count('id'),
+            )
+            .order_by('account_id', 'date')
+        )
+        totals = {}
+        balances = []
+        for row in rows.iterator():
+            # SUM в SQLite считается в плавающей точке — округляем до копеек
+            change = ((row['income'] or Decimal('0.00')) - (row['expense'] or Decimal('0.00'))).quantize(Decimal('0.01'))
+            total = totals[row['account_id']] = totals.get(row['account_id'], Decimal('0.00')) + change
+            balances.append(cls(
+                account_id=row['account_id'], date=row['date'], change=change, total=total, count=row['count']
+            ))
+        with db_transaction.atomic():
+            cls.objects.filter(account_id__in=account_ids).delete()
+            cls.objects.bulk_create(balances, batch_size=1000)
+        return len(balances)
+
+
+
+from django.db.models.signals import pre_save, pre_delete, post_save, post_delete
 from django.dispatch import receiver
 
+from .alerts import check_budget
+from .cache import invalidate_user
+from .currency import converted, rates_changed
+from .ledger import LedgerBatch, signals_enabled
+
+
 @receiver(pre_save, sender=Transaction)
 def transaction_pre_save(sender, instance, **kwargs):
-    if not instance.pk:
-        instance._pre_save_old_amount = None
-        instance._pre_save_old_type = None
-    else:
-        try:
-            old = Transaction.objects.get(pk=instance.pk)
-            instance._pre_save_old_amount = old.amount
-            instance._pre_save_old_type = old.type
-            instance._pre_save_old_account = old.account
-        except Transaction.DoesNotExist:
-            instance._pre_save_old_amount = None
-            instance._pre_save_old_type = None
+    # Старые значения берутся из состояния, загруженного вместе с объектом;
+    # отдельный SELECT нужен только если поля были отложены (only/defer)
+    if instance.pk and instance._loaded_state is None:
+        instance._loaded_state = (
+            Transaction.objects
+            .filter(pk=instance.pk)
+            .values(*Transaction.TRACKED_FIELDS)
+            .first()
+        )
 
 
 @receiver(post_save, sender=Transaction)
 def transaction_post_save(sender, instance, created, **kwargs):
-    if created:
-        delta = instance.amount if instance.type == Transaction.TYPE_INCOME else -instance.amount
-        account_obj = instance.account
-        account_obj.balance = (account_obj.balance or Decimal('0.00')) + Decimal(delta)
-        account_obj.save(update_fields=['balance'])
+    if not signals_enabled():
         return
+    ledger = LedgerBatch()
+    if not created and instance._loaded_state is not None:
+        ledger.remove(instance._loaded_state)
+    ledger.add(instance.tracked_state(), existing=not created)
+    ledger.apply()
 
-    old_amount = getattr(instance, '_pre_save_old_amount', None)
-    old_type = getattr(instance, '_pre_save_old_type', None)
-    old_account = getattr(instance, '_pre_save_old_account', None)
 
-    if old_amount is None or old_type is None or old_account is None:
+@receiver(post_delete, sender=Transaction)
+def transaction_post_delete(sender, instance, origin=None, **kwargs):
+    # При удалении счёта или пользователя транзакции удаляются каскадно вместе с агрегатами
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin is not None and origin_model is not Transaction:
+        return
+    if not signals_enabled():
         return
 
-    old_delta = old_amount if old_type == Transaction.TYPE_INCOME else -old_amount
-    old_account.balance = (old_account.balance or Decimal('0.00')) - Decimal(old_delta)
-    old_account.save(update_fields=['balance'])
+    ledger = LedgerBatch()
+    ledger.remove(instance._loaded_state or instance.tracked_state())
+    ledger.apply()
 
-    new_delta = instance.amount if instance.type == Transaction.TYPE_INCOME else -instance.amount
-    instance.account.balance = (instance.account.balance or Decimal('0.00')) + Decimal(new_delta)
-    instance.account.save(update_fields=['balance'])
 
+@receiver(pre_delete, sender=Category)
+def category_closure_pre_delete(sender, instance, **kwargs):
+    # Дочерние категории становятся корневыми (parent SET_NULL) — убираем их связи со старыми предками
+    CategoryClosure.detach_subtree(instance)
 
-@receiver(post_delete, sender=Transaction)
-def transaction_post_delete(sender, instance, **kwargs):
-    delta = instance.amount if instance.type == Transaction.TYPE_INCOME else -instance.amount
-    acc = instance.account
-    acc.balance = (acc.balance or Decimal('0.00')) - Decimal(delta)
-    acc.save(update_fields=['balance'])
\ No newline at end of file
+
+@receiver(pre_delete, sender=Category)
+def category_rollup_pre_delete(sender, instance, **kwargs):
+    # Транзакции удалённой категории становятся "без категории" — переносим их суммы туда же
+    for rollup in MonthlyRollup.objects.filter(category=instance):
+        MonthlyRollup.apply_delta(
+            rollup.owner_id, rollup.account_id, None,
+            rollup.type, rollup.month, rollup.total, rollup.count
+        )
+        rollup.delete()
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def owner_cache_invalidate(sender, instance, **kwargs):
+    # Изменения транзакций сбрасывают кэш через LedgerBatch
+    invalidate_user(instance.owner_id)
+
+
+@receiver(post_save, sender=Budget)
+def budget_alerts(sender, instance, **kwargs):
+    # Новый лимит может сразу перейти порог по уже учтённым расходам
+    check_budget(instance)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def exchange_rate_changed(sender, instance, **kwargs):
+    rates_changed()
@@ -0,0 +1,107 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj, direction):
+    payload = json.dumps([obj.date.isoformat(), obj.created_at.isoformat(), obj.pk, direction])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw_date, raw_created, pk, direction = json.loads(base64.urlsafe_b64decode(padded))
+        key = (parse_date(raw_date), parse_datetime(raw_created), int(pk))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if None in key or direction not in (NEXT, PREVIOUS):
+        raise InvalidCursor(token)
+    return key, direction
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, count=None, count_capped=False):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.count = count
+        self.count_capped = count_capped
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], PREVIOUS)
+        return None
+
+
+class KeysetPaginator:
+    # Совпадает с Transaction.Meta.ordering, id — для однозначности
+    ordering = ('-date', '-created_at', '-id')
+
+    def __init__(self, queryset, per_page, count_limit=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count_limit = count_limit
+
+    def page(self, cursor=None):
+        if cursor:
+            (date, created_at, pk), direction = decode_cursor(cursor)
+        else:
+            direction = None
+
+        if direction == PREVIOUS:
+            qs = self.queryset.filter(
+                Q(date__gt=date)
+                | Q(date=date, created_at__gt=created_at)
+                | Q(date=date, created_at=created_at, id__gt=pk)
+            ).order_by('date', 'created_at', 'id')
+        else:
+            qs = self.queryset.order_by(*self.ordering)
+            if direction == NEXT:
+                qs = qs.filter(
+                    Q(date__lt=date)
+                    | Q(date=date, created_at__lt=created_at)
+                    | Q(date=date, created_at=created_at, id__lt=pk)
+                )
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, direction == NEXT
+
+        count, capped = self.approximate_count()
+        return KeysetPage(rows, has_next, has_previous, count=count, count_capped=capped)
+
+    def approximate_count(self):
+        # COUNT по ограниченной выборке: не дороже count_limit строк индекса
+        if self.count_limit is None:
+            return None, False
+        count = self.queryset.order_by()[:self.count_limit + 1].count()
+        return min(count, self.count_limit), count > self.count_limit
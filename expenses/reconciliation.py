@@ -0,0 +1,80 @@
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import OperationalError, transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .cache import invalidate_user
+from .models import Account, BalanceCheckpoint, Transaction
+
+ZERO = Decimal('0.00')
+CENT = Decimal('0.01')
+
+Drift = namedtuple('Drift', 'account_id name balance expected')
+
+
+def reconcile_accounts(account_ids, fix=False, full=False):
+    # Суммируются только транзакции после контрольной точки; full пересчитывает журнал целиком
+    with transaction.atomic():
+        checkpoints = {}
+        tail = Transaction.objects.filter(account_id__in=account_ids)
+        if not full:
+            checkpoints = {
+                checkpoint.account_id: checkpoint
+                for checkpoint in BalanceCheckpoint.objects.filter(account_id__in=account_ids)
+            }
+            last_checked = BalanceCheckpoint.objects.filter(account_id=OuterRef('account_id')).values('last_transaction_id')
+            tail = tail.filter(id__gt=Coalesce(Subquery(last_checked[:1]), Value(0)))
+
+        sums = {
+            row['account_id']: row
+            for row in tail.values('account_id').annotate(
+                income=Sum('amount', filter=Q(type=Transaction.TYPE_INCOME)),
+                expense=Sum('amount', filter=Q(type=Transaction.TYPE_EXPENSE)),
+                last_id=Max('id'),
+            ).order_by()
+        }
+
+        drifts = []
+        updated = []
+        accounts = Account.objects.filter(pk__in=account_ids).values_list(
+            'pk', 'owner_id', 'name', 'balance', 'opening_balance'
+        )
+        for pk, owner_id, name, balance, opening in accounts:
+            checkpoint = checkpoints.get(pk)
+            row = sums.get(pk)
+            total = checkpoint.total if checkpoint else ZERO
+            last_id = checkpoint.last_transaction_id if checkpoint else 0
+            if row:
+                # SUM в SQLite считается в плавающей точке — округляем до копеек
+                total += ((row['income'] or ZERO) - (row['expense'] or ZERO)).quantize(CENT)
+                last_id = row['last_id']
+
+            expected = opening + total
+            if balance != expected:
+                drifts.append(Drift(pk, name, balance, expected))
+                if fix:
+                    Account.objects.filter(pk=pk).update(balance=F('balance') - (balance - expected))
+                    invalidate_user(owner_id)
+            updated.append(BalanceCheckpoint(account_id=pk, last_transaction_id=last_id, total=total))
+
+        BalanceCheckpoint.objects.bulk_create(
+            updated,
+            update_conflicts=True,
+            unique_fields=['account'],
+            update_fields=['last_transaction_id', 'total', 'checked_at'],
+        )
+    return len(updated), drifts
+
+
+def retry_locked(func, attempts=50, delay=0.05):
+    # Параллельные пачки на SQLite могут упереться в блокировку записи — повторяем пачку целиком
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError as exc:
+            if 'locked' not in str(exc) or attempt == attempts - 1:
+                raise
+            time.sleep(delay)
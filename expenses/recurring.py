@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger import LedgerBatch
+from .models import RecurringTransaction, Transaction
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def due_rules(today):
+    # Приостановленные и законченные правила хранят next_run = NULL и в индекс не попадают
+    return RecurringTransaction.objects.filter(next_run__lte=today).order_by('next_run', 'pk')
+
+
+def materialize_batch(today, batch_size=DEFAULT_BATCH_SIZE):
+    with transaction.atomic():
+        # Правила блокируются до конца транзакции, поэтому параллельный запуск не вставит те же повторения
+        rules = list(due_rules(today).select_for_update()[:batch_size])
+        if not rules:
+            return 0, 0
+
+        pending = []
+        for rule in rules:
+            pending.extend(rule.build_transaction(day) for day in rule.occurrences(rule.next_run, today))
+            rule.next_run = rule.next_occurrence(after=today)
+
+        # Повторения, которые уже есть в базе (например, после сбоя между вставкой и сдвигом next_run)
+        existing = set(
+            Transaction.objects
+            .filter(recurring_rule__in=rules, occurrence_date__in={tx.occurrence_date for tx in pending})
+            .values_list('recurring_rule_id', 'occurrence_date')
+        )
+        fresh = [tx for tx in pending if (tx.recurring_rule_id, tx.occurrence_date) not in existing]
+
+        # Без ignore_conflicts: конфликт откатывает всю пачку, а не оставляет в ledger строки, которых нет в базе.
+        # bulk_create не отправляет сигналы — баланс и агрегаты правятся одной дельтой на пачку
+        Transaction.objects.bulk_create(fresh)
+        ledger = LedgerBatch()
+        for tx in fresh:
+            ledger.add(tx.tracked_state())
+        ledger.apply()
+
+        RecurringTransaction.objects.bulk_update(rules, ['next_run'])
+    return len(rules), len(fresh)
+
+
+def materialize_due(today=None, batch_size=DEFAULT_BATCH_SIZE):
+    today = today or timezone.localdate()
+    rules = created = 0
+    while True:
+        # Обработанные правила сдвигаются за today, поэтому каждая пачка берёт новые
+        batch_rules, batch_created = materialize_batch(today, batch_size)
+        if not batch_rules:
+            return rules, created
+        rules += batch_rules
+        created += batch_created
@@ -0,0 +1,40 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'expenses_transaction_fts'
+MAX_TERMS = 8
+
+WORD = re.compile(r'\w+')
+
+
+def match_expression(text):
+    # Каждое слово — префикс в кавычках: операторы FTS5 из пользовательского ввода не интерпретируются
+    terms = WORD.findall(text or '')[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_transactions(queryset, text, ranked=False):
+    expression = match_expression(text)
+    if not expression:
+        return queryset
+
+    if connections[queryset.db].vendor != 'sqlite':
+        for term in WORD.findall(text)[:MAX_TERMS]:
+            queryset = queryset.filter(
+                Q(description__icontains=term) | Q(category__name__icontains=term) | Q(account__name__icontains=term)
+            )
+        return queryset
+
+    table = queryset.model._meta.db_table
+    queryset = queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]))
+    if ranked:
+        # bm25: чем меньше, тем релевантнее
+        queryset = queryset.annotate(search_rank=RawSQL(
+            f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [expression],
+            output_field=FloatField(),
+        ))
+    return queryset
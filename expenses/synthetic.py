@@ -0,0 +1,140 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .ledger import LedgerBatch
+from .models import Account, Budget, Category, RecurringTransaction, Transaction, transaction_fingerprint
+
+DEFAULT_PREFIX = 'synthetic_'
+DEFAULT_PASSWORD = 'synthetic'
+
+ACCOUNTS = [('Карта', 'RUB'), ('Наличные', 'RUB'), ('Накопительный', 'RUB')]
+# Категория: (диапазон суммы, вес среди расходов, подкатегории)
+EXPENSE_TREE = {
+    'Еда': ((200, 3000), 30, ['Продукты', 'Кафе']),
+    'Транспорт': ((50, 1500), 15, ['Такси', 'Метро']),
+    'Дом': ((1000, 40000), 10, ['Аренда', 'Коммунальные']),
+    'Развлечения': ((300, 5000), 8, []),
+    'Здоровье': ((500, 8000), 5, []),
+}
+INCOME_CATEGORIES = {
+    'Зарплата': (60000, 180000),
+    'Подработка': (3000, 30000),
+}
+INCOME_SHARE = 0.08
+RECURRING = [('Аренда', Transaction.TYPE_EXPENSE), ('Зарплата', Transaction.TYPE_INCOME)]
+DESCRIPTIONS = ['', 'Оплата картой', 'Перевод', 'Наличными', 'Подписка', 'Покупка онлайн']
+
+
+class SyntheticGenerator:
+    def __init__(self, seed=0, end_date=None, months=12, batch_size=5000):
+        self.seed = seed
+        self.end_date = end_date
+        self.months = months
+        self.batch_size = batch_size
+        self.start_date = end_date.replace(day=1) - relativedelta(months=months - 1)
+
+    def generate(self, users, transactions_per_user, prefix=DEFAULT_PREFIX):
+        User = get_user_model()
+        password = make_password(DEFAULT_PASSWORD)
+        created = User.objects.bulk_create([
+            User(username=f'{prefix}{index:05d}', password=password) for index in range(users)
+        ])
+        # bulk_create на SQLite возвращает pk, но не для всех бэкендов — перечитываем
+        created = User.objects.filter(username__in=[user.username for user in created]).order_by('username')
+
+        total = 0
+        for index, user in enumerate(created):
+            rng = random.Random(f'{self.seed}:{index}')
+            with transaction.atomic():
+                total += self.populate(user, rng, transactions_per_user)
+        return len(created), total
+
+    def populate(self, user, rng, count):
+        # Балансы и агрегаты копятся по всем пачкам пользователя и пишутся один раз в конце
+        ledger = LedgerBatch()
+        accounts = [
+            Account.objects.create(owner=user, name=name, currency=currency, balance=Decimal('0.00'))
+            for name, currency in ACCOUNTS
+        ]
+
+        expense = []
+        for name, (bounds, weight, children) in EXPENSE_TREE.items():
+            root = Category.objects.create(owner=user, name=name)
+            expense.append((root, bounds, weight))
+            for child in children:
+                node = Category.objects.create(owner=user, name=child, parent=root)
+                expense.append((node, bounds, weight))
+        income = [
+            (Category.objects.create(owner=user, name=name), bounds)
+            for name, bounds in INCOME_CATEGORIES.items()
+        ]
+
+        self.create_budgets(user, rng, [item for item in expense if item[0].parent_id is None])
+        self.create_recurring(accounts[0], expense + [(category, bounds, 0) for category, bounds in income], rng)
+
+        days = (self.end_date - self.start_date).days + 1
+        weights = [weight for _, _, weight in expense]
+        batch = []
+        created = 0
+        for _ in range(count):
+            day = self.start_date + timedelta(days=rng.randrange(days))
+            account = rng.choice(accounts)
+            if rng.random() < INCOME_SHARE:
+                category, (low, high) = rng.choice(income)
+                tr_type = Transaction.TYPE_INCOME
+            else:
+                category, (low, high), _ = rng.choices(expense, weights=weights)[0]
+                tr_type = Transaction.TYPE_EXPENSE
+            amount = Decimal(rng.randrange(low * 100, high * 100)) / 100
+            description = rng.choice(DESCRIPTIONS)
+            batch.append(Transaction(
+                owner_id=user.pk,
+                account_id=account.pk,
+                category_id=category.pk,
+                amount=amount,
+                type=tr_type,
+                date=day,
+                description=description,
+                fingerprint=transaction_fingerprint(account.pk, day, amount, description),
+            ))
+            if len(batch) >= self.batch_size:
+                created += self.flush(batch, ledger)
+                batch = []
+        if batch:
+            created += self.flush(batch, ledger)
+        ledger.apply()
+        return created
+
+    def create_budgets(self, user, rng, roots):
+        budgets = []
+        month = self.start_date
+        while month <= self.end_date:
+            for category, (low, high), weight in roots:
+                limit = Decimal(rng.randrange(high * weight // 2, high * weight + 1))
+                budgets.append(Budget(owner=user, category=category, period_start=month, limit_amount=limit))
+            month += relativedelta(months=1)
+        Budget.objects.bulk_create(budgets)
+
+    def create_recurring(self, account, categories, rng):
+        # Правила начинаются после сгенерированного периода и не меняют уже созданные данные
+        by_name = {category.name: (category, bounds) for category, bounds, _ in categories}
+        for name, tr_type in RECURRING:
+            category, (low, high) = by_name[name]
+            RecurringTransaction.objects.create(
+                account=account, category=category, type=tr_type,
+                amount=Decimal(rng.randrange(low, high + 1)),
+                frequency=RecurringTransaction.FREQ_MONTHLY,
+                start_date=self.end_date + timedelta(days=1),
+            )
+
+    def flush(self, batch, ledger):
+        Transaction.objects.bulk_create(batch)
+        for tx in batch:
+            ledger.add(tx.tracked_state())
+        return len(batch)
@@ -1,3 +1,1399 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from dateutil.relativedelta import relativedelta
+from decimal import Decimal
+
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analytics
+from .currency import MissingRate, rate_on
+from .db import configure_sqlite
+from .bulk import bulk_move
+from .forecast import spending_forecast
+from .forms import CategoryForm
+from .importers import StatementError, import_statement, parse_amount
+from .metrics import fingerprint, store as metrics_store
+from .cache import VERSION_ALIAS, stats as cache_stats, version_key
+from .models import (
+    Account, BalanceCheckpoint, Budget, Category, CategoryClosure, DailyBalance, ExchangeRate, MonthlyRollup,
+    Notification, RecurringTransaction, Transaction, transaction_fingerprint,
+)
+from .pagination import NEXT, PREVIOUS, InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .reconciliation import reconcile_accounts
+from .recurring import due_rules, materialize_due
+from .search import search_transactions
+from .synthetic import SyntheticGenerator
+from .views import TransactionListView
+
+
+def retry_locked(func, attempts=200):
+    # SQLite отдаёт "database table is locked" конкурирующим писателям — повторяем
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError as exc:
+            if 'locked' not in str(exc) or attempt == attempts - 1:
+                raise
+            time.sleep(0.005)
+
+
+class AccountBalanceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта', balance=Decimal('100.00'))
+        self.other = Account.objects.create(owner=self.user, name='Наличные')
+        self.category = Category.objects.create(owner=self.user, name='Еда')
+
+    def balance(self, account):
+        account.refresh_from_db()
+        return account.balance
+
+    def test_create_update_delete(self):
+        tx = Transaction.objects.create(
+            account=self.account, category=self.category, amount=Decimal('30.00'), type=Transaction.TYPE_EXPENSE
+        )
+        self.assertEqual(self.balance(self.account), Decimal('70.00'))
+
+        tx.amount = Decimal('10.00')
+        tx.type = Transaction.TYPE_INCOME
+        tx.save()
+        self.assertEqual(self.balance(self.account), Decimal('110.00'))
+
+        tx.account = self.other
+        tx.save()
+        self.assertEqual(self.balance(self.account), Decimal('100.00'))
+        self.assertEqual(self.balance(self.other), Decimal('10.00'))
+
+        tx.delete()
+        self.assertEqual(self.balance(self.other), Decimal('0.00'))
+
+    def test_string_values(self):
+        tx = Transaction.objects.create(
+            account=self.account, category=self.category, amount='30.50', type=Transaction.TYPE_EXPENSE, date='2026-03-01'
+        )
+        self.assertEqual((tx.date, tx.amount), (date(2026, 3, 1), Decimal('30.50')))
+        self.assertEqual(self.balance(self.account), Decimal('69.50'))
+        self.assertEqual(
+            list(MonthlyRollup.objects.filter(account=self.account).values_list('month', 'total')),
+            [(date(2026, 3, 1), Decimal('30.50'))]
+        )
+        self.assertEqual(tx.fingerprint, transaction_fingerprint(self.account.pk, date(2026, 3, 1), '30.50', ''))
+        budget = Budget.objects.create(
+            owner=self.user, category=self.category, period_start='2026-03-15', limit_amount=Decimal('10.00')
+        )
+        self.assertEqual(budget.period_start, date(2026, 3, 1))
+        self.assertEqual(budget.spent_amount, Decimal('30.50'))
+
+    def test_update_uses_loaded_state(self):
+        tx = Transaction.objects.create(account=self.account, amount=Decimal('5.00'), type=Transaction.TYPE_EXPENSE)
+        tx = Transaction.objects.get(pk=tx.pk)
+        tx.amount = Decimal('7.00')
+        with CaptureQueriesContext(connection) as queries:
+            tx.save()
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and '"expenses_transaction"' in q['sql']]
+        self.assertEqual(selects, [])
+        self.assertEqual(self.balance(self.account), Decimal('93.00'))
+
+    def test_account_save_keeps_concurrent_balance_changes(self):
+        stale = Account.objects.get(pk=self.account.pk)
+        Transaction.objects.create(account=self.account, amount=Decimal('30.00'), type=Transaction.TYPE_EXPENSE)
+
+        stale.name = 'Основная карта'
+        stale.save()
+        self.account.refresh_from_db()
+        self.assertEqual((self.account.name, self.account.balance), ('Основная карта', Decimal('70.00')))
+
+        # Ручная правка баланса применяется как разница к текущему значению
+        stale.balance += Decimal('50.00')
+        stale.save()
+        self.assertEqual(stale.balance, Decimal('120.00'))
+        self.account.refresh_from_db()
+        self.assertEqual((self.account.balance, self.account.opening_balance), (Decimal('120.00'), Decimal('150.00')))
+
+
+class MonthlyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+
+    def expense(self, amount, category=None):
+        return Transaction.objects.create(
+            account=self.account, category=category, amount=Decimal(amount),
+            type=Transaction.TYPE_EXPENSE, date=date(2026, 3, 10)
+        )
+
+    def test_single_uncategorized_row(self):
+        food = Category.objects.create(owner=self.user, name='Еда')
+        self.expense('10.00')
+        self.expense('5.00')
+        self.expense('20.00', food)
+        food.delete()
+
+        rollups = MonthlyRollup.objects.filter(owner=self.user)
+        self.assertEqual(list(rollups.values_list('category_id', 'total', 'count')), [(None, Decimal('35.00'), 3)])
+        # NULL в unique_together не мешал дублям — их отсекает частичный индекс
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            MonthlyRollup.objects.create(
+                owner=self.user, account=self.account, type=Transaction.TYPE_EXPENSE, month=date(2026, 3, 1)
+            )
+
+
+class ConcurrentBalanceTests(TransactionTestCase):
+    threads = 8
+    per_thread = 25
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+
+    def run_threads(self, target):
+        errors = []
+
+        def worker(index):
+            try:
+                target(index)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_parallel_writers_do_not_lose_updates(self):
+        def create(index):
+            for _ in range(self.per_thread):
+                retry_locked(lambda: Transaction.objects.create(
+                    account_id=self.account.pk,
+                    amount=Decimal('1.00'),
+                    type=Transaction.TYPE_INCOME if index % 2 else Transaction.TYPE_EXPENSE,
+                ))
+
+        self.run_threads(create)
+
+        incomes = (self.threads // 2) * self.per_thread
+        expenses = (self.threads - self.threads // 2) * self.per_thread
+        self.account.refresh_from_db()
+        self.assertEqual(Transaction.objects.count(), incomes + expenses)
+        self.assertEqual(self.account.balance, Decimal(incomes - expenses))
+
+        def update_and_delete(index):
+            rows = retry_locked(lambda: list(Transaction.objects.all()))
+            for tx in rows:
+                if tx.pk % self.threads != index:
+                    continue
+                if tx.type == Transaction.TYPE_INCOME:
+                    tx.amount = Decimal('2.00')
+                    retry_locked(tx.save)
+                else:
+                    retry_locked(tx.delete)
+
+        self.run_threads(update_and_delete)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal(2 * incomes))
+
+    def test_parallel_imports_of_one_statement_insert_once(self):
+        statement = 'date;amount;description\n' + ''.join(f'2026-03-{day:02d};-10,00;Обед\n' for day in range(1, 21))
+
+        def run(index):
+            retry_locked(lambda: import_statement(self.account, io.StringIO(statement), 'csv', batch_size=5))
+
+        self.run_threads(run)
+
+        self.account.refresh_from_db()
+        self.assertEqual(Transaction.objects.count(), 20)
+        self.assertEqual(self.account.balance, Decimal('-200.00'))
+        self.assertEqual(reconcile_accounts([self.account.pk], full=True)[1], [])
+
+
+class AnalyticsWindowTests(TestCase):
+    def test_period_range(self):
+        self.assertEqual(
+            analytics.period_range(date(2026, 1, 15), date(2026, 3, 31), analytics.GRANULARITY_MONTH),
+            [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)]
+        )
+        self.assertEqual(
+            analytics.period_range(date(2026, 3, 4), date(2026, 3, 16), analytics.GRANULARITY_WEEK),
+            [date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)]
+        )
+        self.assertEqual(
+            analytics.period_range(date(2026, 2, 27), date(2026, 3, 1), analytics.GRANULARITY_DAY),
+            [date(2026, 2, 27), date(2026, 2, 28), date(2026, 3, 1)]
+        )
+
+    def test_parse_window(self):
+        parse = analytics.parse_window
+        self.assertEqual(
+            parse({'date_from': '2026-01-15', 'date_to': '2026-03-10'}),
+            (date(2026, 1, 15), date(2026, 3, 31), 'month')
+        )
+        self.assertEqual(
+            parse({'date_to': '2026-03-10', 'periods': '3', 'granularity': 'year'}),
+            (date(2026, 1, 1), date(2026, 3, 31), 'month')
+        )
+        self.assertEqual(
+            parse({'date_to': '2026-03-11', 'periods': '2', 'granularity': 'week'}),
+            (date(2026, 3, 2), date(2026, 3, 15), 'week')
+        )
+        self.assertEqual(parse({'date_to': '2026-03-10', 'periods': 'x'})[0], date(2025, 10, 1))
+        self.assertEqual(parse({'date_to': '2026-03-10', 'periods': '0', 'granularity': 'day'})[0], date(2026, 3, 10))
+        # Начало позже конца — окно по умолчанию
+        self.assertEqual(
+            parse({'date_from': '2026-04-01', 'date_to': '2026-03-10'}),
+            (date(2025, 10, 1), date(2026, 3, 31), 'month')
+        )
+
+        # Слишком длинные диапазоны обрезаются до MAX_PERIODS с конца
+        self.assertEqual(
+            parse({'date_to': '2026-03-10', 'periods': '5000', 'granularity': 'day'}),
+            (date(2025, 3, 10), date(2026, 3, 10), 'day')
+        )
+        self.assertEqual(
+            parse({'date_from': '2000-01-01', 'date_to': '2026-03-10', 'granularity': 'day'}),
+            (date(2025, 3, 10), date(2026, 3, 10), 'day')
+        )
+
+        # Несуществующие даты заменяются значениями по умолчанию
+        self.assertEqual(
+            parse({'date_from': '2026-02-30', 'date_to': '2026-03-10'}),
+            (date(2025, 10, 1), date(2026, 3, 31), 'month')
+        )
+        today = timezone.now().date()
+        self.assertEqual(
+            parse({'date_from': '2026-01-01', 'date_to': '2026-02-30'}),
+            (date(2026, 1, 1), analytics.period_end(today, 'month'), 'month')
+        )
+
+    def test_invalid_date_in_request(self):
+        self.client.force_login(User.objects.create_user('owner', password='secret'))
+        response = self.client.get(reverse('expenses:analytics'), {'date_to': '2026-02-30'})
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryPlanTests(TestCase):
+    # "SCAN <таблица>" без "USING ... INDEX" — полный проход по таблице
+    FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)(\S+)\s*$')
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+        self.category = Category.objects.create(owner=self.user, name='Еда')
+        self.budget = Budget.objects.create(
+            owner=self.user, category=self.category, period_start=date(2026, 1, 1), limit_amount=Decimal('100.00')
+        )
+        Transaction.objects.create(
+            account=self.account, category=self.category, amount=Decimal('10.00'),
+            type=Transaction.TYPE_EXPENSE, date=date(2026, 1, 15)
+        )
+
+    def assertNoFullScan(self, queryset):
+        plan = queryset.explain()
+        scans = [line for line in plan.splitlines() if self.FULL_SCAN.search(line)]
+        self.assertEqual(scans, [], f'Полный проход по таблице:\n{plan}')
+        return plan
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.assertNoFullScan(queryset)
+        self.assertIn(index_name, plan)
+
+    def list_queryset(self, query=''):
+        view = TransactionListView()
+        view.request = RequestFactory().get('/transactions/' + query)
+        view.request.user = self.user
+        return view.get_queryset().order_by(*KeysetPaginator.ordering)[:21]
+
+    def test_transaction_list(self):
+        for query in ['?type=expense', f'?category={self.category.pk}&type=expense']:
+            with self.subTest(query=query):
+                self.assertNoFullScan(self.list_queryset(query))
+
+        self.assertUsesIndex(self.list_queryset(), 'tx_owner_date_idx')
+        self.assertUsesIndex(self.list_queryset('?date_from=2026-01-01&date_to=2026-01-31'), 'tx_owner_date_idx')
+        self.assertUsesIndex(self.list_queryset(f'?account={self.account.pk}'), 'tx_account_date_idx')
+
+    def test_analytics(self):
+        date_from, date_to = date(2026, 1, 1), date(2026, 6, 30)
+        self.assertUsesIndex(
+            analytics.grouped_queryset(self.user, date_from, date_to, analytics.GRANULARITY_MONTH),
+            'rollup_owner_month_idx'
+        )
+        for granularity in (analytics.GRANULARITY_WEEK, analytics.GRANULARITY_DAY):
+            with self.subTest(granularity=granularity):
+                self.assertUsesIndex(
+                    analytics.grouped_queryset(self.user, date_from, date_to, granularity), 'tx_owner_date_idx'
+                )
+
+    def test_budget_spent(self):
+        self.assertUsesIndex(self.budget.spent_queryset(), 'rollup_category_month_idx')
+        self.assertUsesIndex(Budget.objects.filter(owner=self.user).with_spending(), 'rollup_category_month_idx')
+
+    def test_due_recurring_rules(self):
+        self.assertUsesIndex(due_rules(date(2026, 1, 31))[:500], 'recurring_next_run_idx')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        account = Account.objects.create(owner=self.user, name='Карта')
+        for day in (1, 2, 2, 2, 2, 3, 4):
+            Transaction.objects.create(
+                account=account, amount=Decimal('1.00'), type=Transaction.TYPE_EXPENSE, date=date(2026, 3, day)
+            )
+        # Полные совпадения даты и времени создания — порядок решает только id
+        Transaction.objects.filter(date=date(2026, 3, 2)).update(created_at=timezone.now())
+        self.queryset = Transaction.objects.filter(owner=self.user)
+        self.expected = list(self.queryset.order_by('-date', '-created_at', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [tx.pk for tx in page]
+
+    def test_cursor_round_trip(self):
+        tx = self.queryset.first()
+        for direction in (NEXT, PREVIOUS):
+            self.assertEqual(decode_cursor(encode_cursor(tx, direction)), ((tx.date, tx.created_at, tx.pk), direction))
+
+    def test_walks_forward_and_back_across_ties(self):
+        paginator = KeysetPaginator(self.queryset, 3, count_limit=5)
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+
+        self.assertEqual([self.ids(page) for page in pages], [self.expected[:3], self.expected[3:6], self.expected[6:]])
+        self.assertEqual([(page.has_previous, page.has_next) for page in pages], [(False, True), (True, True), (True, False)])
+        self.assertIsNone(pages[0].previous_cursor)
+        self.assertIsNone(pages[-1].next_cursor)
+        self.assertEqual((pages[0].count, pages[0].count_capped), (5, True))
+
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(paginator.page(back[-1].previous_cursor))
+        self.assertEqual([self.ids(page) for page in back], [self.expected[6:], self.expected[3:6], self.expected[:3]])
+        self.assertEqual([(page.has_previous, page.has_next) for page in back], [(True, False), (True, True), (False, True)])
+
+    def test_invalid_cursor(self):
+        def token(payload):
+            return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+        paginator = KeysetPaginator(self.queryset, 3)
+        valid = ['2026-03-02', '2026-03-02T10:00:00+00:00', 1]
+        for cursor in (
+            'не курсор', 'abc', token('[1, 2'), token('{}'), token('[]'),
+            token(json.dumps(valid + ['x'])), token(json.dumps(['2026-02-30'] + valid[1:] + [NEXT])),
+            token(json.dumps([valid[0], 'вчера', 1, NEXT])), token(json.dumps(valid[:2] + ['id', NEXT])),
+            token(json.dumps(valid + [NEXT, 'лишнее'])),
+        ):
+            with self.assertRaises(InvalidCursor, msg=cursor):
+                paginator.page(cursor)
+
+        # Список транзакций с испорченным курсором показывает первую страницу
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('expenses:transaction_list'), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tx.pk for tx in response.context['transaction_list']], self.expected)
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.card = Account.objects.create(owner=self.user, name='Карта')
+        cash = Account.objects.create(owner=self.user, name='Наличные', currency='USD')
+        food = Category.objects.create(owner=self.user, name='Еда')
+        Transaction.objects.create(
+            account=self.card, category=food, amount=Decimal('12.50'), type=Transaction.TYPE_EXPENSE,
+            date=date(2026, 3, 2), description='Обед; "бизнес-ланч"'
+        )
+        Transaction.objects.create(
+            account=self.card, amount=Decimal('1000.00'), type=Transaction.TYPE_INCOME, date=date(2026, 3, 5)
+        )
+        Transaction.objects.create(
+            account=cash, category=food, amount=Decimal('3.00'), type=Transaction.TYPE_EXPENSE, date=date(2026, 3, 7)
+        )
+        stranger = User.objects.create_user('stranger', password='secret')
+        Transaction.objects.create(
+            account=Account.objects.create(owner=stranger, name='Чужой'), amount=Decimal('99.00'),
+            type=Transaction.TYPE_EXPENSE, date=date(2026, 3, 6), description='Чужая'
+        )
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('expenses:transaction_export'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv(self):
+        content = self.export()
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(content[1:])))
+        self.assertEqual(rows, [
+            ['date', 'account', 'currency', 'category', 'type', 'amount', 'description'],
+            ['2026-03-07', 'Наличные', 'USD', 'Еда', 'expense', '3.00', ''],
+            ['2026-03-05', 'Карта', 'RUB', '', 'income', '1000.00', ''],
+            ['2026-03-02', 'Карта', 'RUB', 'Еда', 'expense', '12.50', 'Обед; "бизнес-ланч"'],
+        ])
+
+        # Фильтры те же, что и в списке транзакций
+        rows = list(csv.reader(io.StringIO(self.export(account=self.card.pk, type='expense', date_to='2026-03-04')[1:])))
+        self.assertEqual([row[0] for row in rows[1:]], ['2026-03-02'])
+
+    def test_json(self):
+        data = json.loads(self.export(format='json'))
+        self.assertEqual([row['date'] for row in data], ['2026-03-07', '2026-03-05', '2026-03-02'])
+        self.assertEqual(data[2], {
+            'date': '2026-03-02', 'account': 'Карта', 'currency': 'RUB', 'category': 'Еда',
+            'type': 'expense', 'amount': '12.50', 'description': 'Обед; "бизнес-ланч"',
+        })
+        self.assertIsNone(data[1]['category'])
+
+        self.assertEqual(json.loads(self.export(format='json', date_from='2027-01-01')), [])
+        self.assertEqual(json.loads(self.export(format='json', q='чужая')), [])
+
+    def test_invalid_filters_are_ignored(self):
+        params = {'category': 'abc', 'account': '1 OR 1', 'date_from': '2026-13-45', 'date_to': 'вчера', 'type': 'expense'}
+        data = json.loads(self.export(format='json', **params))
+        self.assertEqual([row['date'] for row in data], ['2026-03-07', '2026-03-02'])
+
+        response = self.client.get(reverse('expenses:transaction_list'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['object_list']), 2)
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+        self.category = Category.objects.create(owner=self.user, name='Еда')
+        self.client.force_login(self.user)
+
+    def expense(self, amount):
+        Transaction.objects.create(
+            account=self.account, category=self.category, amount=Decimal(amount), type=Transaction.TYPE_EXPENSE
+        )
+
+    def test_repeat_load_skips_database(self):
+        self.expense('10.00')
+        for name in ('expenses:analytics', 'expenses:category_list'):
+            with self.subTest(name=name):
+                self.client.get(reverse(name))
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                touched = [q['sql'] for q in queries if 'expenses_' in q['sql']]
+                self.assertEqual(touched, [])
+
+        snapshot = cache_stats.snapshot()
+        self.assertEqual(snapshot['analytics']['hits'], 1)
+        self.assertEqual(snapshot['categories']['misses'], 1)
+
+    def test_writes_invalidate(self):
+        self.expense('10.00')
+        self.assertEqual(self.client.get(reverse('expenses:analytics')).context['total_expense'], Decimal('10.00'))
+
+        self.expense('5.00')
+        self.assertEqual(self.client.get(reverse('expenses:analytics')).context['total_expense'], Decimal('15.00'))
+
+        Budget.objects.create(
+            owner=self.user, category=self.category, period_start=timezone.localdate(), limit_amount=Decimal('100.00')
+        )
+        budgets = self.client.get(reverse('expenses:category_list')).context['object_list'][0].latest_budgets
+        self.assertEqual(budgets[0].spent_amount, Decimal('15.00'))
+
+    def test_versions_are_shared_between_processes(self):
+        self.expense('10.00')
+        self.assertEqual(self.client.get(reverse('expenses:analytics')).context['total_expense'], Decimal('10.00'))
+
+        # Запись из другого процесса (cron, management-команда): свой объект кэша версий над тем же каталогом
+        Transaction.objects.filter(owner=self.user).update(amount=Decimal('25.00'))
+        call_command('rebuild_rollups', user=self.user.pk, stdout=io.StringIO())
+        self.assertEqual(self.client.get(reverse('expenses:analytics')).context['total_expense'], Decimal('25.00'))
+
+        MonthlyRollup.objects.filter(owner=self.user).update(total=Decimal('40.00'))
+        other = FileBasedCache(django_settings.CACHES[VERSION_ALIAS]['LOCATION'], {'TIMEOUT': None})
+        other.set(version_key(self.user.pk), 'other-process', None)
+        self.assertEqual(self.client.get(reverse('expenses:analytics')).context['total_expense'], Decimal('40.00'))
+        self.assertIsNone(cache.get(version_key(self.user.pk)))
+
+
+class CategoryClosureTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+        self.food = Category.objects.create(owner=self.user, name='Еда')
+        self.groceries = Category.objects.create(owner=self.user, name='Продукты', parent=self.food)
+        self.veg = Category.objects.create(owner=self.user, name='Овощи', parent=self.groceries)
+        self.cafe = Category.objects.create(owner=self.user, name='Кафе')
+
+    def links(self):
+        return set(CategoryClosure.objects.values_list('ancestor__name', 'descendant__name', 'depth'))
+
+    def expected(self, parents):
+        names = dict(Category.objects.values_list('pk', 'name'))
+        links = set()
+        for pk, name in names.items():
+            ancestor, depth = pk, 0
+            while ancestor is not None:
+                links.add((names[ancestor], name, depth))
+                ancestor, depth = parents.get(ancestor), depth + 1
+        return links
+
+    def test_closure_follows_tree(self):
+        self.assertEqual(self.links(), self.expected(dict(Category.objects.values_list('pk', 'parent_id'))))
+
+        self.groceries.parent = self.cafe
+        self.groceries.save()
+        self.assertIn(('Кафе', 'Овощи', 2), self.links())
+        self.assertNotIn(('Еда', 'Овощи', 2), self.links())
+
+        self.groceries.delete()
+        self.assertEqual(self.links(), self.expected(dict(Category.objects.values_list('pk', 'parent_id'))))
+        self.assertEqual(Category.objects.get(pk=self.veg.pk).parent_id, None)
+
+    def test_cycle_rejected(self):
+        self.food.parent = self.veg
+        with self.assertRaises(ValidationError):
+            self.food.save()
+        self.assertEqual(Category.objects.get(pk=self.food.pk).parent_id, None)
+
+    def test_parent_budget_counts_descendants(self):
+        month = date(2026, 3, 1)
+        for category, amount in ((self.food, '5.00'), (self.groceries, '10.00'), (self.veg, '20.00'), (self.cafe, '40.00')):
+            Transaction.objects.create(
+                account=self.account, category=category, amount=Decimal(amount),
+                type=Transaction.TYPE_EXPENSE, date=date(2026, 3, 10)
+            )
+        budget = Budget.objects.create(owner=self.user, category=self.food, period_start=month, limit_amount=Decimal('50.00'))
+
+        self.assertEqual(budget.spent_amount, Decimal('35.00'))
+        self.assertEqual(Budget.objects.with_spent().get(pk=budget.pk).spent, Decimal('35.00'))
+
+        report = analytics.build_report(self.user, month, date(2026, 3, 31))
+        totals = {row['category__name']: (row['own'], row['total']) for row in report.by_category_tree('expense')}
+        self.assertEqual(totals['Еда'], (Decimal('5.00'), Decimal('35.00')))
+        self.assertEqual(totals['Продукты'], (Decimal('10.00'), Decimal('30.00')))
+        self.assertEqual(totals['Кафе'], (Decimal('40.00'), Decimal('40.00')))
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.food = Category.objects.create(owner=self.user, name='Еда')
+        self.groceries = Category.objects.create(owner=self.user, name='Продукты', parent=self.food)
+        self.veg = Category.objects.create(owner=self.user, name='Овощи', parent=self.groceries)
+        self.cafe = Category.objects.create(owner=self.user, name='Кафе')
+
+    def test_parent_choices_exclude_subtree(self):
+        form = CategoryForm(instance=self.groceries, user=self.user)
+        self.assertEqual(
+            [label for pk, label in form.fields['parent'].choices if pk],
+            ['Еда', 'Кафе'],
+        )
+        self.assertIn((self.veg.pk, '— — Овощи'), CategoryForm(user=self.user).fields['parent'].choices)
+
+        form = CategoryForm({'name': 'Еда', 'parent': self.veg.pk}, instance=self.food, user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertIn('parent', form.errors)
+
+    def test_list_without_parent_queries(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('expenses:category_list'))
+        self.assertContains(response, 'Родитель: Продукты')
+        category_queries = [q for q in queries if 'FROM "expenses_category"' in q['sql']]
+        self.assertEqual(len(category_queries), 1)
+
+
+class QueryMetricsTests(TestCase):
+    def setUp(self):
+        metrics_store.reset()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.client.force_login(self.user)
+        # Лог метрик пишется во временный файл, а не в BASE_DIR/metrics.log
+        self.log_path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'metrics.log')
+        self.enterContext(override_settings(METRICS_LOG=self.log_path))
+
+    def logged_views(self):
+        with open(self.log_path, encoding='utf-8') as log:
+            return [json.loads(line)['view'] for line in log]
+
+    def test_records_queries_per_view(self):
+        self.client.get(reverse('expenses:account_list'))
+        self.client.get(reverse('expenses:account_list'))
+        summary = {row['view']: row for row in metrics_store.summary()}
+        self.assertEqual(summary['expenses:account_list']['requests'], 2)
+        self.assertGreater(summary['expenses:account_list']['queries_p50'], 0)
+        self.assertEqual(self.logged_views(), ['expenses:account_list'] * 2)
+
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = \'x\''),
+            'SELECT * FROM t WHERE id IN (...) AND name = ?'
+        )
+
+    async def test_records_queries_of_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('expenses:budget_data'))
+        self.assertEqual(response.status_code, 200)
+        summary = {row['view']: row for row in metrics_store.summary()}
+        self.assertGreater(summary['expenses:budget_data']['queries_p50'], 0)
+        self.assertEqual(self.logged_views(), ['expenses:budget_data'])
+
+    def test_metrics_page_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('expenses:metrics')).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertContains(self.client.get(reverse('expenses:metrics')), 'expenses:metrics')
+
+
+class SyntheticDataTests(TestCase):
+    def generate(self, prefix):
+        SyntheticGenerator(seed=7, end_date=date(2026, 6, 30), months=3, batch_size=50).generate(2, 120, prefix=prefix)
+        return list(
+            Transaction.objects
+            .filter(owner__username__startswith=prefix)
+            .order_by('owner__username', 'id')
+            .values_list('account__name', 'category__name', 'amount', 'type', 'date', 'description')
+        )
+
+    def test_same_seed_same_data(self):
+        first = self.generate('a_')
+        self.assertEqual(len(first), 240)
+        self.assertEqual(first, self.generate('b_'))
+
+        for account in Account.objects.filter(owner__username__startswith='a_'):
+            signed = sum(
+                Transaction.signed_amount(tx.amount, tx.type) for tx in Transaction.objects.filter(account=account)
+            )
+            self.assertEqual(account.balance, signed)
+
+
+class SqlitePragmaTests(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4321, 'busy_timeout': 1234})
+    def test_pragmas_applied_on_connect(self):
+        configure_sqlite(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4321)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта', balance=Decimal('100.00'))
+
+    def create(self, amount, tr_type=Transaction.TYPE_EXPENSE):
+        return Transaction.objects.create(account=self.account, amount=Decimal(amount), type=tr_type)
+
+    def drifts(self, **kwargs):
+        return reconcile_accounts([self.account.pk], **kwargs)[1]
+
+    def test_checkpoint_follows_edits_of_checked_rows(self):
+        old = self.create('10.00')
+        doomed = self.create('5.00')
+        self.assertEqual(self.drifts(), [])
+        checkpoint = BalanceCheckpoint.objects.get(account=self.account)
+        self.assertEqual((checkpoint.last_transaction_id, checkpoint.total), (doomed.pk, Decimal('-15.00')))
+
+        old.amount = Decimal('12.00')
+        old.save()
+        doomed.delete()
+        self.create('50.00', Transaction.TYPE_INCOME)
+        self.assertEqual(self.drifts(), [])
+        self.assertEqual(BalanceCheckpoint.objects.get(account=self.account).total, Decimal('38.00'))
+
+        # Ручная правка баланса на форме — корректировка начального остатка, а не расхождение
+        account = Account.objects.get(pk=self.account.pk)
+        account.balance += Decimal('20.00')
+        account.save()
+        self.assertEqual(self.drifts(), [])
+
+    def test_reports_and_fixes_drift(self):
+        self.create('10.00')
+        Account.objects.filter(pk=self.account.pk).update(balance=F('balance') + Decimal('7.00'))
+
+        [drift] = self.drifts()
+        self.assertEqual((drift.balance, drift.expected), (Decimal('97.00'), Decimal('90.00')))
+        self.assertEqual(len(self.drifts(fix=True)), 1)
+        self.assertEqual(self.drifts(full=True), [])
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('90.00'))
+
+
+class CurrencyConversionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.rub = Account.objects.create(owner=self.user, name='Карта', currency='RUB')
+        self.usd = Account.objects.create(owner=self.user, name='Доллары', currency='USD')
+        self.category = Category.objects.create(owner=self.user, name='Еда')
+        ExchangeRate.objects.create(currency='USD', date=date(2026, 3, 1), rate=Decimal('90'))
+        ExchangeRate.objects.create(currency='USD', date=date(2026, 3, 15), rate=Decimal('100'))
+
+    def expense(self, account, amount, day):
+        Transaction.objects.create(
+            account=account, category=self.category, amount=Decimal(amount),
+            type=Transaction.TYPE_EXPENSE, date=day
+        )
+
+    def test_totals_in_base_currency(self):
+        self.expense(self.rub, '500.00', date(2026, 3, 10))
+        self.expense(self.usd, '10.00', date(2026, 3, 10))
+        self.expense(self.usd, '1.00', date(2026, 3, 20))
+
+        self.assertEqual(rate_on('USD', date(2026, 3, 20)), Decimal('100'))
+        self.assertEqual(rate_on('USD', date(2026, 2, 1)), Decimal('90'))
+
+        # По дням — курс на дату транзакции
+        daily = analytics.build_report(self.user, date(2026, 3, 1), date(2026, 3, 31), analytics.GRANULARITY_DAY)
+        self.assertEqual(daily.totals()[1], Decimal('1500.00'))
+
+        # По месяцам и в бюджете — курс на первое число месяца
+        monthly = analytics.build_report(self.user, date(2026, 3, 1), date(2026, 3, 31))
+        self.assertEqual(monthly.totals()[1], Decimal('1490.00'))
+        budget = Budget.objects.create(
+            owner=self.user, category=self.category, period_start=date(2026, 3, 1), limit_amount=Decimal('1000.00')
+        )
+        self.assertEqual(budget.spent_amount, Decimal('1490.00'))
+        self.assertTrue(Budget.objects.with_spending().get(pk=budget.pk).over_limit)
+
+    def test_missing_rate_is_reported(self):
+        eur = Account.objects.create(owner=self.user, name='Евро', currency='EUR', balance=Decimal('5.00'))
+        self.expense(self.rub, '500.00', date(2026, 3, 10))
+        self.expense(eur, '10.00', date(2026, 3, 10))
+
+        with self.assertRaises(MissingRate):
+            rate_on('EUR', date(2026, 3, 10))
+        # Сумма без курса не считается как уже пересчитанная в базовую валюту
+        for granularity in (analytics.GRANULARITY_DAY, analytics.GRANULARITY_MONTH):
+            report = analytics.build_report(self.user, date(2026, 3, 1), date(2026, 3, 31), granularity)
+            self.assertEqual(report.totals()[1], Decimal('500.00'))
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('expenses:account_list'))
+        self.assertEqual(response.context['missing_rates'], ['EUR'])
+        self.assertEqual(response.context['total_balance'], Decimal('-500.00'))
+        self.assertContains(response, 'Нет курсов для валют: EUR')
+        self.assertEqual(self.client.get(reverse('expenses:budget_list')).context['missing_rates'], ['EUR'])
+
+        # Курс, загруженный другим процессом без сигналов, виден сразу
+        ExchangeRate.objects.bulk_create([ExchangeRate(currency='EUR', date=date(2026, 3, 1), rate=Decimal('100'))])
+        self.assertEqual(rate_on('EUR', date(2026, 3, 10)), Decimal('100'))
+        response = self.client.get(reverse('expenses:account_list'))
+        self.assertEqual(response.context['missing_rates'], [])
+        self.assertEqual(response.context['total_balance'], Decimal('-1000.00'))
+
+
+class BudgetStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        category = Category.objects.create(owner=self.user, name='Еда')
+        self.current = timezone.localdate().replace(day=1)
+        for period_start in (date(2026, 1, 1), self.current):
+            Budget.objects.create(
+                owner=self.user, category=category, period_start=period_start, limit_amount=Decimal('100.00')
+            )
+        self.client.force_login(self.user)
+
+    def periods(self, **params):
+        response = self.client.get(reverse('expenses:budget_status'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['period_start'] for row in response.json()['budgets'])
+
+    def test_period_filter(self):
+        self.assertEqual(self.periods(), sorted({'2026-01-01', self.current.isoformat()}))
+        self.assertEqual(self.periods(period='2026-01'), ['2026-01-01'])
+        # Некорректный месяц не роняет запрос, а показывает текущий
+        for period in ('2026-13', '2026-1x', 'abc'):
+            self.assertEqual(self.periods(period=period), [self.current.isoformat()])
+
+    def test_one_budget_per_category_and_month(self):
+        category = Category.objects.get(owner=self.user)
+        add = f"{reverse('expenses:budget_add')}?category={category.pk}"
+        response = self.client.post(add, {'period_start': '2026-02-15', 'limit_amount': '50.00'})
+        self.assertEqual(response.status_code, 302)
+        budget = Budget.objects.get(owner=self.user, period_start=date(2026, 2, 1))
+
+        # Другая дата того же месяца — ошибка формы, а не IntegrityError
+        response = self.client.post(add, {'period_start': '2026-02-20', 'limit_amount': '70.00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Бюджет этой категории на этот месяц уже есть')
+        response = self.client.post(
+            reverse('expenses:budget_edit', args=[budget.pk]), {'period_start': '2026-01-31', 'limit_amount': '50.00'}
+        )
+        self.assertContains(response, 'Бюджет этой категории на этот месяц уже есть')
+
+        response = self.client.post(
+            reverse('expenses:budget_edit', args=[budget.pk]), {'period_start': '2026-02-27', 'limit_amount': '60.00'}
+        )
+        self.assertEqual(response.status_code, 302)
+        budget.refresh_from_db()
+        self.assertEqual((budget.period_start, budget.limit_amount), (date(2026, 2, 1), Decimal('60.00')))
+        self.assertEqual(Budget.objects.filter(owner=self.user).count(), 3)
+
+    def test_category_list_budget_queries(self):
+        account = Account.objects.create(owner=self.user, name='Карта')
+
+        def add_category(name, spent):
+            category = Category.objects.create(owner=self.user, name=name)
+            Budget.objects.create(owner=self.user, category=category, period_start=self.current, limit_amount=Decimal('50.00'))
+            Transaction.objects.create(
+                account=account, category=category, amount=Decimal(spent), type=Transaction.TYPE_EXPENSE, date=self.current
+            )
+
+        def render():
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse('expenses:category_list'))
+            return response, len(captured)
+
+        add_category('Кафе', '80.00')
+        _, queries = render()
+        for number in range(5):
+            add_category(f'Такси {number}', '20.00')
+        response, more_queries = render()
+        # Бюджеты и их траты грузятся вместе с категориями, а не запросом на каждую карточку
+        self.assertEqual(more_queries, queries)
+
+        budgets = {category.name: category.latest_budgets for category in response.context['category_list']}
+        self.assertEqual([budget.period_start for budget in budgets['Еда']], [self.current])
+        cafe = budgets['Кафе'][0]
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                (cafe.spent_amount, cafe.remaining_amount, cafe.is_over_limit, cafe.progress_percent),
+                (Decimal('80.00'), Decimal('0.00'), True, 100)
+            )
+        self.assertEqual(Budget.objects.get(pk=cafe.pk).spent_amount, Decimal('80.00'))
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+        self.food = Category.objects.create(owner=self.user, name='Еда')
+        self.cafe = Category.objects.create(owner=self.user, name='Кафе', parent=self.food)
+        today = timezone.localdate()
+        for category, amount in ((self.food, '100.00'), (self.cafe, '40.00')):
+            Transaction.objects.create(
+                account=self.account, category=category, amount=Decimal(amount),
+                type=Transaction.TYPE_EXPENSE, date=today
+            )
+        Budget.objects.create(
+            owner=self.user, category=self.food, period_start=today.replace(day=1), limit_amount=Decimal('120.00')
+        )
+
+    async def test_sections_match_report(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('expenses:analytics_data'), {'granularity': 'day', 'periods': 7})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['series']), 7)
+        self.assertEqual(data['totals']['expense'], '140.00')
+        self.assertEqual(data['categories']['expense_tree'][0]['total'], '140.00')
+
+        response = await self.async_client.get(reverse('expenses:analytics_data'), {'section': 'series'})
+        self.assertEqual(list(response.json()), ['series', 'granularity', 'currency'])
+
+        data = (await self.async_client.get(reverse('expenses:budget_data'))).json()
+        self.assertEqual(data['summary'], {'limit': '120.00', 'spent': '140.00', 'over_limit': 1})
+        self.assertEqual(data['months'][0]['expense'], '140.00')
+
+        # Некорректный месяц — текущий месяц вместо ошибки
+        data = (await self.async_client.get(reverse('expenses:budget_data'), {'period': '2026-13'})).json()
+        self.assertEqual(data['summary']['spent'], '140.00')
+        self.assertEqual([row['month'] for row in data['months']], [timezone.localdate().replace(day=1).isoformat()])
+
+
+class RecurringTransactionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта', balance=Decimal('1000.00'))
+        self.rent = RecurringTransaction.objects.create(
+            account=self.account, amount=Decimal('100.00'), type=Transaction.TYPE_EXPENSE,
+            frequency=RecurringTransaction.FREQ_MONTHLY, start_date=date(2026, 1, 31)
+        )
+
+    def test_materializes_due_occurrences_once(self):
+        self.assertEqual(materialize_due(date(2026, 4, 15)), (1, 3))
+        self.assertEqual(
+            list(self.rent.transactions.order_by('date').values_list('date', flat=True)),
+            [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)]
+        )
+        self.rent.refresh_from_db()
+        self.assertEqual(self.rent.next_run, date(2026, 4, 30))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('700.00'))
+        self.assertEqual(analytics.build_report(self.user, date(2026, 1, 1), date(2026, 3, 31)).totals()[1], Decimal('300.00'))
+
+        # Повторный запуск и сброшенный next_run не создают дублей и не трогают баланс
+        self.assertEqual(materialize_due(date(2026, 4, 15)), (0, 0))
+        RecurringTransaction.objects.update(next_run=date(2026, 1, 31))
+        self.assertEqual(materialize_due(date(2026, 4, 15)), (1, 0))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('700.00'))
+
+        # После паузы и возобновления продолжаем с первого несозданного повторения
+        self.rent.is_active = False
+        self.rent.save()
+        self.assertIsNone(self.rent.next_run)
+        self.rent.is_active = True
+        self.rent.save()
+        self.assertEqual(self.rent.next_run, date(2026, 4, 30))
+
+    def test_conflicting_insert_rolls_back_batch(self):
+        bulk_create = Transaction.objects.bulk_create
+
+        def race(objs, **kwargs):
+            # Параллельный запуск успевает вставить одно из повторений (и сам правит баланс)
+            Transaction.objects.create(**{
+                field: getattr(objs[1], field)
+                for field in ('account', 'amount', 'type', 'date', 'recurring_rule_id', 'occurrence_date')
+            })
+            return bulk_create(objs, **kwargs)
+
+        # Конфликт откатывает пачку целиком, следующий запуск досоздаёт оставшиеся повторения
+        with mock.patch.object(Transaction.objects, 'bulk_create', side_effect=race):
+            with self.assertRaises(IntegrityError):
+                materialize_due(date(2026, 4, 15))
+        self.assertEqual(self.rent.transactions.count(), 0)
+
+        Transaction.objects.create(
+            account=self.account, amount=Decimal('100.00'), type=Transaction.TYPE_EXPENSE,
+            date=date(2026, 2, 28), recurring_rule_id=self.rent.pk, occurrence_date=date(2026, 2, 28)
+        )
+        self.assertEqual(materialize_due(date(2026, 4, 15)), (1, 2))
+        self.assertEqual(self.rent.transactions.count(), 3)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('700.00'))
+        self.assertEqual(reconcile_accounts([self.account.pk], full=True)[1], [])
+
+
+class TransactionSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+        self.cafe = Category.objects.create(owner=self.user, name='Кафе')
+        self.coffee = self.create('Кофе в кофейне, кофе с собой', self.cafe)
+        self.taxi = self.create('Такси домой')
+        stranger = User.objects.create_user('stranger', password='secret')
+        Transaction.objects.create(
+            account=Account.objects.create(owner=stranger, name='Карта'), amount=Decimal('5.00'),
+            type=Transaction.TYPE_EXPENSE, description='Кофе'
+        )
+        self.client.force_login(self.user)
+
+    def create(self, description, category=None):
+        return Transaction.objects.create(
+            account=self.account, category=category, amount=Decimal('10.00'),
+            type=Transaction.TYPE_EXPENSE, description=description
+        )
+
+    def found(self, query):
+        response = self.client.get(reverse('expenses:transaction_list'), {'q': query})
+        return {tx.pk for tx in response.context['transaction_list']}
+
+    def test_search_follows_writes(self):
+        self.assertEqual(self.found('коф'), {self.coffee.pk})
+        self.assertEqual(self.found('кафе'), {self.coffee.pk})
+        self.assertEqual(self.found('такси карта'), {self.taxi.pk})
+        self.assertEqual(self.found('"OR" *'), set())
+
+        self.cafe.name = 'Рестораны'
+        self.cafe.save()
+        Transaction.objects.filter(pk=self.taxi.pk).update(description='Такси в ресторан')
+        self.assertEqual(self.found('рестор'), {self.coffee.pk, self.taxi.pk})
+
+        self.coffee.delete()
+        self.assertEqual(self.found('рестор'), {self.taxi.pk})
+
+        # В админке лучшие совпадения идут первыми
+        self.create('Такси до кофейни, долгая поездка через весь город')
+        self.create('Кофе')
+        ranked = search_transactions(Transaction.objects.filter(owner=self.user), 'кофе', ranked=True)
+        self.assertEqual(ranked.order_by('search_rank')[0].description, 'Кофе')
+
+    def test_admin_search_without_words(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        url = reverse('admin:expenses_transaction_changelist')
+        response = self.client.get(url, {'q': '!!!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 3)
+        response = self.client.get(url, {'q': 'кофе'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class BudgetAlertTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+        self.food = Category.objects.create(owner=self.user, name='Еда')
+        self.cafe = Category.objects.create(owner=self.user, name='Кафе', parent=self.food)
+        self.budget = Budget.objects.create(
+            owner=self.user, category=self.food, period_start=date(2026, 3, 1), limit_amount=Decimal('100.00')
+        )
+
+    def spend(self, amount, category=None):
+        return Transaction.objects.create(
+            account=self.account, category=category or self.cafe, amount=Decimal(amount),
+            type=Transaction.TYPE_EXPENSE, date=date(2026, 3, 10)
+        )
+
+    def thresholds(self):
+        return list(Notification.objects.order_by('pk').values_list('threshold', flat=True))
+
+    def test_thresholds_fire_once(self):
+        self.spend('40.00')
+        self.assertEqual(self.thresholds(), [])
+
+        # Проверка бюджета не пересчитывает транзакции месяца — только агрегаты
+        with CaptureQueriesContext(connection) as captured:
+            self.spend('15.00')
+        self.assertFalse([q for q in captured if q['sql'].startswith('SELECT') and 'expenses_transaction"' in q['sql']])
+        self.assertEqual(self.thresholds(), [50])
+
+        self.spend('30.00')
+        big = self.spend('20.00', self.food)
+        self.spend('1.00')
+        self.assertEqual(self.thresholds(), [50, 80, 100])
+
+        # После снижения расходов повторное превышение снова уведомляет
+        big.delete()
+        self.spend('20.00')
+        self.assertEqual(self.thresholds(), [50, 80, 100, 100])
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('expenses:home')).context['unread_notifications'], 4)
+        self.client.post(reverse('expenses:notification_read'))
+        self.assertEqual(self.client.get(reverse('expenses:home')).context['unread_notifications'], 0)
+
+
+class SpendingForecastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта')
+        self.food = Category.objects.create(owner=self.user, name='Еда')
+        self.cafe = Category.objects.create(owner=self.user, name='Кафе')
+        # Год истории: еда ровно по 100 в месяц, кафе — 10 или 20
+        for months in range(1, 13):
+            day = date(2026, 6, 5) - relativedelta(months=months)
+            self.spend(self.food, '100.00', day)
+            self.spend(self.cafe, '10.00' if months % 2 else '20.00', day)
+        self.spend(self.food, '50.00', date(2026, 6, 5))
+        self.spend(self.cafe, '300.00', date(2026, 6, 5))
+
+    def spend(self, category, amount, day):
+        Transaction.objects.create(
+            account=self.account, category=category, amount=Decimal(amount), type=Transaction.TYPE_EXPENSE, date=day
+        )
+
+    def test_projection_and_anomalies(self):
+        forecast = spending_forecast(self.user, date(2026, 6, 15))
+        self.assertEqual(forecast['anomalies'], 1)
+        cafe, food = forecast['categories']
+        self.assertEqual((cafe['category__name'], cafe['anomaly']), ('Кафе', True))
+        self.assertGreater(cafe['z_score'], 2)
+
+        # Половина месяца при ровной истории: прогноз совпадает со средним
+        self.assertEqual(food['spent'], Decimal('50.00'))
+        self.assertEqual(food['moving_average'], Decimal('100.00'))
+        self.assertEqual(food['forecast'], Decimal('100.00'))
+        self.assertFalse(food['anomaly'])
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('expenses:analytics'), {'date_to': '2026-06-15'})
+        self.assertEqual(response.context['forecast']['categories'][0]['category__name'], 'Кафе')
+        data = self.client.get(
+            reverse('expenses:analytics_data'), {'section': 'forecast', 'date_to': '2026-06-15', 'granularity': 'day'}
+        ).json()
+        self.assertEqual(data['forecast']['categories'][1]['forecast'], '100.00')
+
+
+class DailyBalanceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта', balance=Decimal('1000.00'))
+
+    def create(self, amount, day, tr_type=Transaction.TYPE_EXPENSE):
+        return Transaction.objects.create(account=self.account, amount=Decimal(amount), type=tr_type, date=day)
+
+    def totals(self):
+        return list(DailyBalance.objects.filter(account=self.account, count__gt=0).values_list('date', 'total'))
+
+    def test_incremental_matches_rebuild(self):
+        rent = self.create('100.00', date(2026, 3, 10))
+        self.create('50.00', date(2026, 3, 20), Transaction.TYPE_INCOME)
+
+        # Транзакция задним числом сдвигает последующие дни одним UPDATE
+        with CaptureQueriesContext(connection) as captured:
+            self.create('30.00', date(2026, 3, 5))
+        self.assertEqual(len([q for q in captured if q['sql'].startswith('UPDATE "expenses_dailybalance"')]), 1)
+        self.assertEqual(self.totals(), [
+            (date(2026, 3, 5), Decimal('-30.00')),
+            (date(2026, 3, 10), Decimal('-130.00')),
+            (date(2026, 3, 20), Decimal('-80.00')),
+        ])
+
+        rent.amount = Decimal('60.00')
+        rent.date = date(2026, 3, 25)
+        rent.save()
+        expected = [
+            (date(2026, 3, 5), Decimal('-30.00')),
+            (date(2026, 3, 20), Decimal('20.00')),
+            (date(2026, 3, 25), Decimal('-40.00')),
+        ]
+        self.assertEqual(self.totals(), expected)
+        DailyBalance.rebuild([self.account.pk])
+        self.assertEqual(self.totals(), expected)
+
+        self.client.force_login(self.user)
+        data = self.client.get(
+            reverse('expenses:account_history_data', args=[self.account.pk]),
+            {'date_from': '2026-03-01', 'date_to': '2026-03-31'},
+        ).json()
+        self.assertEqual(len(data['points']), 31)
+        self.assertEqual(data['points'][0]['balance'], '1000.00')
+        self.assertEqual(data['points'][21], {'date': '2026-03-22', 'change': '0.00', 'balance': '1020.00'})
+        self.assertEqual(data['points'][-1]['balance'], '960.00')
+
+
+class BulkActionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.card = Account.objects.create(owner=self.user, name='Карта', balance=Decimal('1000.00'))
+        self.cash = Account.objects.create(owner=self.user, name='Наличные')
+        self.food = Category.objects.create(owner=self.user, name='Еда')
+        self.cafe = Category.objects.create(owner=self.user, name='Кафе')
+        self.expenses = [
+            Transaction.objects.create(
+                account=self.card, category=self.food, amount=Decimal('30.00'),
+                type=Transaction.TYPE_EXPENSE, date=date(2026, 3, day), description='Обед'
+            )
+            for day in (5, 10, 15)
+        ]
+        self.salary = Transaction.objects.create(
+            account=self.card, amount=Decimal('500.00'), type=Transaction.TYPE_INCOME, date=date(2026, 3, 1)
+        )
+        self.client.force_login(self.user)
+
+    def balances(self):
+        return list(Account.objects.order_by('pk').values_list('balance', flat=True))
+
+    def assert_consistent(self):
+        ids = [self.card.pk, self.cash.pk]
+        self.assertEqual(reconcile_accounts(ids, full=True)[1], [])
+        report = analytics.build_report(self.user, date(2026, 3, 1), date(2026, 3, 31))
+        by_account = {row['account__name']: (row['income'], row['expense']) for row in report.by_account()}
+        daily = list(DailyBalance.objects.filter(count__gt=0).values_list('account_id', 'date', 'total'))
+        DailyBalance.rebuild(ids)
+        self.assertEqual(list(DailyBalance.objects.values_list('account_id', 'date', 'total')), daily)
+        return by_account
+
+    def test_bulk_actions_fix_derived_state(self):
+        url = reverse('expenses:transaction_bulk')
+        self.client.post(url, {
+            'action': 'category', 'category': self.cafe.pk, 'ids': [self.expenses[0].pk, self.expenses[1].pk]
+        })
+        self.assertEqual(self.food.transactions.count(), 1)
+        self.assertEqual(
+            {row['category__name']: row['total'] for row in analytics.build_report(
+                self.user, date(2026, 3, 1), date(2026, 3, 31)).by_category('expense')},
+            {'Кафе': Decimal('60.00'), 'Еда': Decimal('30.00')}
+        )
+
+        # Перенос всех расходов по фильтру: одна корректировка балансов на все затронутые счета
+        with CaptureQueriesContext(connection) as captured:
+            self.client.post(f'{url}?type=expense', {'action': 'account', 'account': self.cash.pk, 'select_all': '1'})
+        self.assertEqual(len([q for q in captured if q['sql'].startswith('UPDATE "expenses_account"')]), 1)
+        self.assertEqual(self.balances(), [Decimal('1500.00'), Decimal('-90.00')])
+        self.assertEqual(self.assert_consistent(), {
+            'Карта': (Decimal('500.00'), Decimal('0.00')), 'Наличные': (Decimal('0.00'), Decimal('90.00'))
+        })
+        moved = Transaction.objects.get(pk=self.expenses[0].pk)
+        self.assertEqual(moved.fingerprint, transaction_fingerprint(self.cash.pk, moved.date, moved.amount, moved.description))
+
+        response = self.client.post(url, {'action': 'delete', 'ids': [self.expenses[2].pk, self.salary.pk]})
+        self.assertEqual(self.balances(), [Decimal('1000.00'), Decimal('-60.00')])
+        self.assertEqual(self.assert_consistent(), {
+            'Карта': (Decimal('0.00'), Decimal('0.00')), 'Наличные': (Decimal('0.00'), Decimal('60.00'))
+        })
+        self.assertEqual(
+            [str(message) for message in response.wsgi_request._messages],
+            ['Изменено транзакций: 2', 'Изменено транзакций: 3', 'Удалено транзакций: 2']
+        )
+        self.assertEqual(search_transactions(Transaction.objects.all(), 'Обед').count(), 2)
+
+        other = Account.objects.create(owner=User.objects.create_user('other'), name='Чужой')
+        with self.assertRaises(ValidationError):
+            bulk_move(Transaction.objects.all(), other)
+
+    def test_invalid_target_is_reported(self):
+        stranger = User.objects.create_user('stranger')
+        other_account = Account.objects.create(owner=stranger, name='Чужой')
+        other_category = Category.objects.create(owner=stranger, name='Чужая')
+        url = reverse('expenses:transaction_bulk')
+        ids = [tx.pk for tx in self.expenses]
+
+        for data in (
+            {'action': 'account', 'account': other_account.pk, 'ids': ids},
+            {'action': 'category', 'category': other_category.pk, 'ids': ids},
+            {'action': 'account', 'ids': ids},
+            {'action': 'rename', 'ids': ids},
+            {'action': 'delete', 'ids': [0]},
+        ):
+            response = self.client.post(f'{url}?type=expense', data)
+            self.assertRedirects(response, f"{reverse('expenses:transaction_list')}?type=expense", fetch_redirect_response=False)
+
+        messages = [str(message) for message in response.wsgi_request._messages]
+        self.assertEqual(len(messages), 5)
+        self.assertTrue(messages[0].startswith('Счёт: '))
+        self.assertTrue(messages[1].startswith('Категория: '))
+        self.assertEqual(messages[2], 'Выберите счёт')
+        self.assertTrue(messages[3].startswith('Действие: '))
+        self.assertTrue(messages[4].startswith('Транзакции: '))
+        self.assertEqual(self.balances()[:2], [Decimal('1410.00'), Decimal('0.00')])
+        self.assertEqual(self.food.transactions.count(), 3)
+
+    def test_invalid_filter_rejects_select_all(self):
+        url = reverse('expenses:transaction_bulk')
+        for query in ('category=abc&type=expense', 'date_from=2026-13-45', f'account={self.cash.pk + 100}'):
+            response = self.client.post(f'{url}?{query}', {'action': 'delete', 'select_all': '1'})
+        messages = [str(message) for message in response.wsgi_request._messages]
+        self.assertEqual(messages[::2], ['Некорректный фильтр, действие не выполнено'] * 3)
+        self.assertEqual([message.split(':')[0] for message in messages[1::2]], ['Категория', 'Дата с', 'Счёт'])
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.assertEqual(self.balances(), [Decimal('1410.00'), Decimal('0.00')])
+
+
+class StatementImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='secret')
+        self.account = Account.objects.create(owner=self.user, name='Карта', balance=Decimal('100.00'))
+        self.food = Category.objects.create(owner=self.user, name='Еда')
+
+    def run_import(self, text, fmt='csv', batch_size=500):
+        return import_statement(self.account, io.StringIO(text), fmt, batch_size=batch_size)
+
+    def test_parse_amount(self):
+        self.assertEqual(parse_amount(' 1 234,5 '), Decimal('1234.50'))
+        self.assertEqual(parse_amount('-0.01'), Decimal('-0.01'))
+        for value in ('Infinity', 'NaN', 'sNaN', '1e30', '10000000000', '0.001', '0', 'abc', ''):
+            with self.assertRaises(StatementError, msg=value):
+                parse_amount(value)
+
+    def test_csv_and_ofx(self):
+        result = self.run_import(
+            'Date;Amount;Type;Category;Description\n'
+            '05.03.2026;250,00;расход;еда;Продукты\n'
+            '2026-03-06;1000;Доход;;Зарплата\n'
+            '2026-03-07;-40;;;Кофе\n'
+            '2026-03-08;Infinity;;;Ошибка\n'
+            '2026-02-30;10;;;Ошибка\n'
+        )
+        self.assertEqual((result.created, result.duplicates), (3, 0))
+        self.assertEqual([line for line, _ in result.errors], [5, 6])
+        rows = list(self.account.transactions.order_by('date').values_list('date', 'amount', 'type', 'category_id'))
+        self.assertEqual(rows, [
+            (date(2026, 3, 5), Decimal('250.00'), Transaction.TYPE_EXPENSE, self.food.pk),
+            (date(2026, 3, 6), Decimal('1000.00'), Transaction.TYPE_INCOME, None),
+            (date(2026, 3, 7), Decimal('40.00'), Transaction.TYPE_EXPENSE, None),
+        ])
+
+        result = self.run_import(
+            '<OFX><BANKTRANLIST>\n'
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260310120000<TRNAMT>-15.50<NAME>Такси<MEMO>Поездка</STMTTRN>\n'
+            '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260311<TRNAMT>20.00<NAME>Возврат</STMTTRN>\n'
+            '<STMTTRN><DTPOSTED>20260312<TRNAMT>NaN</STMTTRN>\n'
+            '</BANKTRANLIST></OFX>\n',
+            fmt='ofx',
+        )
+        self.assertEqual((result.created, len(result.errors)), (2, 1))
+        taxi = self.account.transactions.get(date=date(2026, 3, 10))
+        self.assertEqual((taxi.amount, taxi.type, taxi.description), (Decimal('15.50'), Transaction.TYPE_EXPENSE, 'Такси — Поездка'))
+
+    def test_duplicates_and_batched_balance_update(self):
+        Transaction.objects.create(
+            account=self.account, amount=Decimal('40.00'), type=Transaction.TYPE_EXPENSE,
+            date=date(2026, 3, 7), description='Кофе'
+        )
+        statement = (
+            'date,amount,description\n'
+            '2026-03-07,-40,Кофе\n'
+            '2026-03-08,-5,Вода\n'
+            '2026-03-08,-5,Вода\n'
+            '2026-03-09,-7,Хлеб\n'
+            '2026-03-10,30,Кэшбэк\n'
+        )
+        # Одна правка баланса на пачку, а не на строку
+        with CaptureQueriesContext(connection) as captured:
+            result = self.run_import(statement, batch_size=2)
+        self.assertEqual((result.created, result.duplicates), (4, 1))
+        self.assertEqual(len([q for q in captured if q['sql'].startswith('UPDATE "expenses_account"')]), 3)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('73.00'))
+
+        # Повторный импорт той же выписки ничего не добавляет
+        result = self.run_import(statement)
+        self.assertEqual((result.created, result.duplicates), (0, 5))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('73.00'))
+        self.assertEqual(reconcile_accounts([self.account.pk], full=True)[1], [])
+
+    def test_conflicting_batch_is_retried(self):
+        bulk_create = Transaction.objects.bulk_create
+        calls = []
+
+        def race(objs, **kwargs):
+            # Параллельный импорт вставляет строку с тем же ключом между проверкой и вставкой
+            calls.append(len(objs))
+            if len(calls) == 1:
+                Transaction.objects.create(**{
+                    field: getattr(objs[0], field)
+                    for field in ('account', 'amount', 'type', 'date', 'description', 'fingerprint', 'import_key')
+                })
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Transaction.objects, 'bulk_create', side_effect=race):
+            result = self.run_import('date;amount;description\n2026-03-07;-40;Кофе\n2026-03-08;-5;Вода\n')
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual((result.created, result.duplicates), (2, 0))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('55.00'))
+        self.assertEqual(reconcile_accounts([self.account.pk], full=True)[1], [])
+
+        with mock.patch.object(Transaction.objects, 'bulk_create', side_effect=IntegrityError('conflict')):
+            with self.assertRaises(IntegrityError):
+                self.run_import('date;amount;description\n2026-03-09;-7;Хлеб\n')
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('55.00'))
@@ -0,0 +1,75 @@
+from .models import Category
+
+INDENT = '— '
+
+
+class CategoryTree:
+    # Дерево категорий пользователя в памяти: один запрос, обход без обращений к базе
+    def __init__(self, categories):
+        self.nodes = {category.pk: category for category in categories}
+        self.children = {pk: [] for pk in self.nodes}
+        roots = []
+        for category in self.nodes.values():
+            if category.parent_id in self.nodes:
+                self.children[category.parent_id].append(category)
+            else:
+                roots.append(category)
+
+        self.depths = {}
+        self.order = []
+        self._walk(roots)
+        # Узлы, замкнутые в цикл (испорченные данные), недостижимы от корней — показываем их корнями
+        for category in self.nodes.values():
+            if category.pk not in self.depths:
+                self._walk([category])
+
+        parent_field = Category._meta.get_field('parent')
+        for category in self.nodes.values():
+            parent_field.set_cached_value(category, self.nodes.get(category.parent_id))
+
+    @classmethod
+    def for_owner(cls, owner, queryset=None):
+        if queryset is None:
+            queryset = Category.objects.all()
+        return cls(queryset.filter(owner=owner))
+
+    def _walk(self, roots):
+        stack = [(category, 0) for category in reversed(roots)]
+        while stack:
+            category, depth = stack.pop()
+            if category.pk in self.depths:
+                continue
+            self.depths[category.pk] = depth
+            self.order.append(category)
+            stack.extend((child, depth + 1) for child in reversed(self.children[category.pk]))
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def depth(self, category):
+        return self.depths[category.pk]
+
+    def subtree_ids(self, pk):
+        result = set()
+        stack = [pk]
+        while stack:
+            current = stack.pop()
+            if current in result or current not in self.nodes:
+                continue
+            result.add(current)
+            stack.extend(child.pk for child in self.children[current])
+        return result
+
+    def can_attach(self, pk, parent_pk):
+        return pk is None or parent_pk is None or parent_pk not in self.subtree_ids(pk)
+
+    def choices(self, exclude=None):
+        excluded = self.subtree_ids(exclude) if exclude is not None else set()
+        return [
+            (category.pk, INDENT * self.depths[category.pk] + category.name)
+            for category in self.order
+            if category.pk not in excluded
+        ]
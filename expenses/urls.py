@@ -18,19 +18,35 @@ urlpatterns = [
     path('accounts/add/', views.AccountCreateView.as_view(), name='account_add'),
     path('accounts/<int:pk>/edit/', views.AccountUpdateView.as_view(), name='account_edit'),
     path('accounts/<int:pk>/delete/', views.AccountDeleteView.as_view(), name='account_delete'),
+    path('accounts/<int:pk>/history/', views.AccountHistoryView.as_view(), name='account_history'),
+    path('accounts/<int:pk>/history/data/', views.account_history_data, name='account_history_data'),
     path('transactions/', views.TransactionListView.as_view(), name='transaction_list'),
     path('transactions/add/', views.TransactionCreateView.as_view(), name='transaction_add'),
+    path('transactions/import/', views.TransactionImportView.as_view(), name='transaction_import'),
+    path('transactions/bulk/', views.TransactionBulkView.as_view(), name='transaction_bulk'),
+    path('transactions/export/', views.TransactionExportView.as_view(), name='transaction_export'),
     path('transactions/<int:pk>/edit/', views.TransactionUpdateView.as_view(), name='transaction_edit'),
     path('transactions/<int:pk>/delete/', views.TransactionDeleteView.as_view(), name='transaction_delete'),
     path('transactions/<int:pk>/', views.TransactionDetailView.as_view(), name='transaction_detail'),
+    path('recurring/', views.RecurringListView.as_view(), name='recurring_list'),
+    path('recurring/add/', views.RecurringCreateView.as_view(), name='recurring_add'),
+    path('recurring/<int:pk>/edit/', views.RecurringUpdateView.as_view(), name='recurring_edit'),
+    path('recurring/<int:pk>/delete/', views.RecurringDeleteView.as_view(), name='recurring_delete'),
     path('categories/', views.CategoryListView.as_view(), name='category_list'),
     path('categories/add/', views.CategoryCreateView.as_view(), name='category_add'),
     path('categories/<int:pk>/edit/', views.CategoryUpdateView.as_view(), name='category_edit'),
     path('categories/<int:pk>/delete/', views.CategoryDeleteView.as_view(), name='category_delete'),
     path('budgets/add/', views.BudgetCreateView.as_view(), name='budget_add'),
     path('budgets/', views.BudgetListView.as_view(), name='budget_list'),
+    path('budgets/status/', views.BudgetStatusView.as_view(), name='budget_status'),
+    path('budgets/data/', views.budget_data, name='budget_data'),
     path('budgets/<int:pk>/edit/', views.BudgetUpdateView.as_view(), name='budget_edit'),
     path('budgets/<int:pk>/delete/', views.BudgetDeleteView.as_view(), name='budget_delete'),
-    path('analytics/', views.AnalyticsView.as_view(), name='analytics')
+    path('notifications/', views.NotificationListView.as_view(), name='notification_list'),
+    path('notifications/read/', views.NotificationReadView.as_view(), name='notification_read'),
+    path('analytics/', views.AnalyticsView.as_view(), name='analytics'),
+    path('analytics/data/', views.analytics_data, name='analytics_data'),
+    path('cache/stats/', views.CacheStatsView.as_view(), name='cache_stats'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
 
@@ -1,19 +1,32 @@
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.views.generic import DetailView
-from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Account, Category, Transaction, Budget
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from .models import Account, Category, MonthlyRollup, Notification, RecurringTransaction, Transaction, Budget
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.views import LoginView, LogoutView
 from django.shortcuts import render, redirect
-from django.urls import reverse_lazy
-from .forms import CustomUserCreationForm
+from django.contrib import messages
+from django.urls import reverse, reverse_lazy
+from .forms import BudgetForm, CategoryForm, CustomUserCreationForm, TransactionBulkForm, TransactionFilterForm, TransactionImportForm
 from decimal import Decimal
-from django.views.generic import TemplateView
-from django.db.models import Sum
-from django.utils.timezone import now
-from dateutil.relativedelta import relativedelta
+from django.views.generic import FormView, TemplateView, View
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Sum
 from django.shortcuts import get_object_or_404
+from . import analytics, bulk, forecast, history
+from .cache import acached_for_user, cached_for_user, invalidate_user, stats as cache_stats
+from .currency import CENT, MissingRate, base_currency, converted, missing_rates, rate_on
+from .metrics import store as metrics_store
+from .importers import import_statement
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import search_transactions
+from .tree import CategoryTree
+import csv
+import io
 import json
 
 class CustomLoginView(LoginView):
@@ -42,6 +55,27 @@ class AccountListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         return Account.objects.filter(owner=self.request.user)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        today = timezone.localdate()
+        # Курс — один запрос на валюту; счета в валюте без курсов в итог не входят и перечисляются отдельно
+        rates = {}
+        for code in {account.currency for account in context['object_list']}:
+            try:
+                rates[code] = rate_on(code, today)
+            except MissingRate:
+                pass
+        context['currency'] = base_currency()
+        context['total_balance'] = sum(
+            (
+                (account.balance * rates[account.currency]).quantize(CENT)
+                for account in context['object_list'] if account.currency in rates
+            ),
+            Decimal('0.00')
+        )
+        context['missing_rates'] = sorted({account.currency for account in context['object_list']} - set(rates))
+        return context
+
 class AccountCreateView(LoginRequiredMixin, CreateView):
     model = Account
     fields = ['name', 'currency', 'balance']
@@ -69,40 +103,95 @@ class AccountDeleteView(LoginRequiredMixin, DeleteView):
 
     def get_queryset(self):
         return Account.objects.filter(owner=self.request.user)
+
+
+class AccountHistoryView(LoginRequiredMixin, DetailView):
+    model = Account
+    template_name = 'expenses/account_history.html'
+
+    def get_queryset(self):
+        return Account.objects.filter(owner=self.request.user)
+
+    def get_context_data(self, **kwargs):
+        # Сам график страница догружает из account_history_data
+        context = super().get_context_data(**kwargs)
+        context['date_from'], context['date_to'] = history.parse_range(self.request.GET)
+        return context
+
+
+@login_required
+async def account_history_data(request, pk):
+    user = await request.auser()
+    account = await Account.objects.filter(owner=user, pk=pk).afirst()
+    if account is None:
+        raise Http404
+    date_from, date_to = history.parse_range(request.GET)
+
+    points = await acached_for_user(
+        user.pk, 'account_history', [pk, date_from, date_to],
+        lambda: history.load_history(account, date_from, date_to),
+    )
+    return JsonResponse({
+        'account': account.name,
+        'currency': account.currency,
+        'date_from': date_from,
+        'date_to': date_to,
+        'points': points,
+    })
     
 # Transaction Views
-class TransactionListView(LoginRequiredMixin, ListView):
-    model = Transaction
-    template_name = 'expenses/transaction_list.html'
-    paginate_by = 20
+class TransactionFilterMixin:
+    @cached_property
+    def filter_form(self):
+        form = TransactionFilterForm(self.request.GET, user=self.request.user)
+        form.is_valid()
+        return form
 
-    def get_queryset(self):
-        qs = Transaction.objects.filter(
-            account__owner=self.request.user
-        ).order_by('-date')
+    def filter_transactions(self, qs):
+        # Некорректные значения фильтров (не число, не дата, чужой счёт) пропускаются
+        data = self.filter_form.cleaned_data
 
-        date_from = self.request.GET.get('date_from')
-        if date_from:
-            qs = qs.filter(date__gte=date_from)
+        if data.get('date_from'):
+            qs = qs.filter(date__gte=data['date_from'])
 
-        date_to = self.request.GET.get('date_to')
-        if date_to:
-            qs = qs.filter(date__lte=date_to)
+        if data.get('date_to'):
+            qs = qs.filter(date__lte=data['date_to'])
 
-        category = self.request.GET.get('category')
-        if category:
-            qs = qs.filter(category_id=category)
+        if data.get('category'):
+            qs = qs.filter(category=data['category'])
 
-        account = self.request.GET.get('account')
-        if account:
-            qs = qs.filter(account_id=account)
+        if data.get('account'):
+            qs = qs.filter(account=data['account'])
 
-        tr_type = self.request.GET.get('type')
-        if tr_type in ['income', 'expense']:
-            qs = qs.filter(type=tr_type)
+        if data.get('type'):
+            qs = qs.filter(type=data['type'])
+
+        if data.get('q'):
+            qs = search_transactions(qs, data['q'])
 
         return qs
 
+
+class TransactionListView(LoginRequiredMixin, TransactionFilterMixin, ListView):
+    model = Transaction
+    template_name = 'expenses/transaction_list.html'
+    paginate_by = 20
+    count_limit = 1000
+
+    def get_queryset(self):
+        qs = Transaction.objects.filter(
+            owner=self.request.user
+        ).select_related('account', 'category')
+        return self.filter_transactions(qs)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, count_limit=self.count_limit)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            page = paginator.page()
+        return paginator, page, page.object_list, page.has_next or page.has_previous
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
@@ -116,9 +205,48 @@ class TransactionListView(LoginRequiredMixin, ListView):
             'category': self.request.GET.get('category', ''),
             'account': self.request.GET.get('account', ''),
             'type': self.request.GET.get('type', ''),
+            'q': self.request.GET.get('q', ''),
         }
         return context
 
+class Echo:
+    def write(self, value):
+        return value
+
+
+class TransactionExportView(LoginRequiredMixin, TransactionFilterMixin, View):
+    EXPORT_FIELDS = ['date', 'account__name', 'account__currency', 'category__name', 'type', 'amount', 'description']
+    CHUNK_SIZE = 2000
+
+    def get(self, request):
+        rows = self.filter_transactions(
+            Transaction.objects.filter(owner=request.user).order_by('-date')
+        ).values_list(*self.EXPORT_FIELDS).iterator(chunk_size=self.CHUNK_SIZE)
+
+        if request.GET.get('format') == 'json':
+            response = StreamingHttpResponse(self.stream_json(rows), content_type='application/json')
+            response['Content-Disposition'] = 'attachment; filename="transactions.json"'
+        else:
+            response = StreamingHttpResponse(self.stream_csv(rows), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
+        return response
+
+    def stream_csv(self, rows):
+        writer = csv.writer(Echo())
+        # BOM, чтобы Excel открыл файл в UTF-8
+        yield '\ufeff' + writer.writerow(['date', 'account', 'currency', 'category', 'type', 'amount', 'description'])
+        for row in rows:
+            yield writer.writerow(row)
+
+    def stream_json(self, rows):
+        keys = ['date', 'account', 'currency', 'category', 'type', 'amount', 'description']
+        yield '['
+        separator = ''
+        for row in rows:
+            yield separator + json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder, ensure_ascii=False)
+            separator = ','
+        yield ']'
+
 class TransactionCreateView(LoginRequiredMixin, CreateView):
     model = Transaction
     fields = ['account', 'category', 'amount', 'type', 'date', 'description']
@@ -131,7 +259,34 @@ class TransactionCreateView(LoginRequiredMixin, CreateView):
         form.fields['category'].queryset = Category.objects.filter(owner=self.request.user)
         return form
 
-from django.db.models.signals import post_save
+class TransactionBulkView(LoginRequiredMixin, TransactionFilterMixin, View):
+    # Фильтры списка приходят в строке запроса, выбор и действие — в теле формы
+    def post(self, request):
+        form = TransactionBulkForm(request.POST, user=request.user)
+        if not form.is_valid():
+            # Форма живёт в списке транзакций, поэтому ошибки полей тоже показываются сообщениями
+            self.report_errors(form)
+        elif form.cleaned_data['select_all'] and not self.filter_form.is_valid():
+            # Пропущенный фильтр расширил бы действие на все транзакции пользователя
+            messages.error(request, 'Некорректный фильтр, действие не выполнено')
+            self.report_errors(self.filter_form)
+        else:
+            data = form.cleaned_data
+            if data['select_all']:
+                selection = self.filter_transactions(Transaction.objects.filter(owner=request.user))
+            else:
+                selection = data['ids']
+            count = bulk.apply_action(selection, data['action'], category=data['category'], account=data['account'])
+            verb = 'Удалено' if data['action'] == bulk.ACTION_DELETE else 'Изменено'
+            messages.success(request, f'{verb} транзакций: {count}')
+        return redirect(f"{reverse('expenses:transaction_list')}?{request.GET.urlencode()}")
+
+    def report_errors(self, form):
+        for name, errors in form.errors.items():
+            label = form.fields[name].label if name in form.fields else None
+            for error in errors:
+                messages.error(self.request, f'{label}: {error}' if label else error)
+
 
 class TransactionUpdateView(LoginRequiredMixin, UpdateView):
     model = Transaction
@@ -140,7 +295,7 @@ class TransactionUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('expenses:transaction_list')
 
     def get_queryset(self):
-        return Transaction.objects.filter(account__owner=self.request.user)
+        return Transaction.objects.filter(owner=self.request.user)
 
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
@@ -148,43 +303,71 @@ class TransactionUpdateView(LoginRequiredMixin, UpdateView):
         form.fields['category'].queryset = Category.objects.filter(owner=self.request.user)
         return form
 
-    def form_valid(self, form):
-        old_tx = Transaction.objects.get(pk=self.object.pk)
+class TransactionDeleteView(LoginRequiredMixin, DeleteView):
+    model = Transaction
+    template_name = 'expenses/transaction_confirm_delete.html'
+    success_url = reverse_lazy('expenses:transaction_list')
 
-        from .models import transaction_post_save
-        post_save.disconnect(transaction_post_save, sender=Transaction)
+    def get_queryset(self):
+        return Transaction.objects.filter(owner=self.request.user)
 
-        response = super().form_valid(form)
-        new_tx = self.object
+class RecurringFormMixin:
+    model = RecurringTransaction
+    fields = ['account', 'category', 'amount', 'type', 'description', 'frequency', 'interval', 'start_date', 'end_date', 'is_active']
+    template_name = 'expenses/recurring_form.html'
+    success_url = reverse_lazy('expenses:recurring_list')
 
-        def delta_for(tx):
-            return tx.amount if tx.type == Transaction.TYPE_INCOME else -tx.amount
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        form.fields['account'].queryset = Account.objects.filter(owner=self.request.user)
+        form.fields['category'].queryset = Category.objects.filter(owner=self.request.user)
+        return form
 
-        if old_tx.account_id == new_tx.account_id:
 
-            account = new_tx.account
-            account.balance = (account.balance or Decimal('0.00')) - delta_for(old_tx) + delta_for(new_tx)
-            account.save(update_fields=['balance'])
-        else:
-            old_acc = old_tx.account
-            old_acc.balance = (old_acc.balance or Decimal('0.00')) - delta_for(old_tx)
-            old_acc.save(update_fields=['balance'])
+class RecurringListView(LoginRequiredMixin, ListView):
+    model = RecurringTransaction
+    template_name = 'expenses/recurring_list.html'
+    context_object_name = 'rules'
 
-            new_acc = new_tx.account
-            new_acc.balance = (new_acc.balance or Decimal('0.00')) + delta_for(new_tx)
-            new_acc.save(update_fields=['balance'])
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(owner=self.request.user).select_related('account', 'category')
 
-        post_save.connect(transaction_post_save, sender=Transaction)
 
-        return response
+class RecurringCreateView(LoginRequiredMixin, RecurringFormMixin, CreateView):
+    pass
+
+
+class RecurringUpdateView(LoginRequiredMixin, RecurringFormMixin, UpdateView):
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(owner=self.request.user)
 
-class TransactionDeleteView(LoginRequiredMixin, DeleteView):
-    model = Transaction
-    template_name = 'expenses/transaction_confirm_delete.html'
-    success_url = reverse_lazy('expenses:transaction_list')
+
+class RecurringDeleteView(LoginRequiredMixin, DeleteView):
+    model = RecurringTransaction
+    template_name = 'expenses/recurring_confirm_delete.html'
+    success_url = reverse_lazy('expenses:recurring_list')
 
     def get_queryset(self):
-        return Transaction.objects.filter(account__owner=self.request.user)
+        return RecurringTransaction.objects.filter(owner=self.request.user)
+
+class TransactionImportView(LoginRequiredMixin, FormView):
+    form_class = TransactionImportForm
+    template_name = 'expenses/transaction_import.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', errors='replace', newline='')
+        result = import_statement(
+            form.cleaned_data['account'],
+            stream,
+            form.cleaned_data['format'],
+            batch_size=form.cleaned_data['batch_size'],
+        )
+        return self.render_to_response(self.get_context_data(form=form, result=result))
 
 class TransactionDetailView(LoginRequiredMixin, DetailView):
     model = Transaction
@@ -195,7 +378,7 @@ class TransactionDetailView(LoginRequiredMixin, DetailView):
         return get_object_or_404(
             Transaction,
             pk=self.kwargs['pk'],
-            account__owner=self.request.user
+            owner=self.request.user
         )
 
 # Category Views
@@ -206,7 +389,17 @@ class CategoryListView(LoginRequiredMixin, ListView):
     context_object_name = 'category_list'  
 
     def get_queryset(self):
-        return Category.objects.filter(owner=self.request.user)
+        latest_budget = Prefetch(
+            'budgets',
+            queryset=Budget.objects.with_spent().order_by('-period_start')[:1],
+            to_attr='latest_budgets'
+        )
+        queryset = Category.objects.prefetch_related(latest_budget)
+        # Родители берутся из дерева в памяти, а не отдельным запросом на каждую карточку
+        return cached_for_user(
+            self.request.user.pk, 'categories', [],
+            lambda: list(CategoryTree.for_owner(self.request.user, queryset))
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -216,36 +409,32 @@ class CategoryListView(LoginRequiredMixin, ListView):
 
 class CategoryCreateView(LoginRequiredMixin, CreateView):
     model = Category
-    fields = ['name', 'parent']
+    form_class = CategoryForm
     template_name = 'expenses/category_form.html'
     success_url = reverse_lazy('expenses:category_list')
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         form.instance.owner = self.request.user
         return super().form_valid(form)
 
-    def get_form(self, form_class=None):
-        form = super().get_form(form_class)
-        form.fields['parent'].queryset = Category.objects.filter(owner=self.request.user)
-        return form
-    
 class CategoryUpdateView(LoginRequiredMixin, UpdateView):
     model = Category
-    fields = ['name', 'parent']
+    form_class = CategoryForm
     template_name = 'expenses/category_form.html'
     success_url = reverse_lazy('expenses:category_list')
 
     def get_queryset(self):
         return Category.objects.filter(owner=self.request.user)
 
-    def get_form(self, form_class=None):
-        form = super().get_form(form_class)
-        form.fields['parent'].queryset = (
-            Category.objects
-            .filter(owner=self.request.user)
-            .exclude(pk=self.object.pk)
-        )
-        return form
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
 
 class CategoryDeleteView(LoginRequiredMixin, DeleteView):
     model = Category
@@ -257,10 +446,15 @@ class CategoryDeleteView(LoginRequiredMixin, DeleteView):
 
 class BudgetCreateView(LoginRequiredMixin, CreateView):
     model = Budget
-    fields = ['period_start', 'limit_amount']
+    form_class = BudgetForm
     template_name = 'expenses/budget_form.html'
     success_url = reverse_lazy('expenses:category_list')
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs.update(user=self.request.user, category_id=self.request.GET.get('category'))
+        return kwargs
+
     def form_valid(self, form):
         form.instance.owner = self.request.user
         form.instance.category_id = self.request.GET.get('category')
@@ -279,17 +473,79 @@ class BudgetListView(LoginRequiredMixin, ListView):
     context_object_name = 'budgets'
 
     def get_queryset(self):
-        return Budget.objects.filter(owner=self.request.user).select_related('category')
+        return Budget.objects.filter(owner=self.request.user).select_related('category').with_spending()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['missing_rates'] = missing_rates(self.request.user)
+        return context
+
+
+class BudgetStatusView(LoginRequiredMixin, View):
+    def get(self, request):
+        budgets = Budget.objects.filter(owner=request.user).with_spending()
+
+        period = analytics.parse_period(request.GET.get('period'))
+        if period:
+            budgets = budgets.filter(period_start=period)
+
+        data = cached_for_user(request.user.pk, 'budget_status', [period], lambda: list(budgets.values(
+            'id', 'category_id', 'category__name', 'period_start', 'limit_amount',
+            'spent', 'remaining', 'over_limit', 'percent'
+        )))
+        return JsonResponse({'budgets': data})
+
+@login_required
+async def budget_data(request):
+    user = await request.auser()
+    budgets = Budget.objects.filter(owner=user).with_spending()
+
+    period = analytics.parse_period(request.GET.get('period'))
+    if period:
+        budgets = budgets.filter(period_start=period)
+
+    expenses = MonthlyRollup.objects.filter(owner=user, type=Transaction.TYPE_EXPENSE)
+    if period:
+        expenses = expenses.filter(month=period)
+
+    async def load():
+        # Бюджеты и общие расходы по месяцам (включая категории без бюджета)
+        rows = await analytics.fetch_all(budgets.values(
+            'id', 'category_id', 'category__name', 'period_start', 'limit_amount',
+            'spent', 'remaining', 'over_limit', 'percent'
+        ))
+        months = await analytics.fetch_all(
+            expenses.values('month').annotate(total=Sum(converted('total', date_ref='month'))).order_by('month')
+        )
+        return {
+            'budgets': rows,
+            'summary': {
+                'limit': sum((row['limit_amount'] for row in rows), Decimal('0.00')),
+                'spent': sum((row['spent'] for row in rows), Decimal('0.00')),
+                'over_limit': sum(1 for row in rows if row['over_limit']),
+            },
+            'months': [
+                {'month': row['month'], 'expense': (row['total'] or Decimal('0.00')).quantize(Decimal('0.01'))}
+                for row in months
+            ],
+        }
+
+    return JsonResponse(await acached_for_user(user.pk, 'budget_data', [period], load))
 
 class BudgetUpdateView(LoginRequiredMixin, UpdateView):
     model = Budget
-    fields = ['period_start', 'limit_amount']
+    form_class = BudgetForm
     template_name = 'expenses/budget_form.html'
     success_url = reverse_lazy('expenses:category_list')
 
     def get_queryset(self):
         return Budget.objects.filter(owner=self.request.user)
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
     def get_form(self):
         form = super().get_form()
         form.fields['period_start'].widget.attrs.update({'class': 'form-control'})
@@ -308,66 +564,95 @@ class BudgetDeleteView(LoginRequiredMixin, DeleteView):
 class AnalyticsView(LoginRequiredMixin, TemplateView):
     template_name = "expenses/analytics.html"
 
+    def get_window(self):
+        return analytics.parse_window(self.request.GET)
+
+    def get_report(self):
+        date_from, date_to, granularity = self.get_window()
+        return analytics.current_report(self.request.user, date_to, granularity)
+
+    def build_analytics(self):
+        # Графики страница догружает из analytics_data; здесь только карточки и таблицы текущего периода
+        report = self.get_report()
+        current = report.current_period
+        data = {}
+
+        data['granularity'] = report.granularity
+        data['current_period'] = current
+        data['total_income'], data['total_expense'] = report.totals(current)
+        data['balance'] = data['total_income'] - data['total_expense']
+
+        data['expense_by_tree'] = report.by_category_tree('expense', current)
+        data['by_account'] = report.by_account(current)
+
+        date_to = self.get_window()[1]
+        data['forecast'] = forecast.spending_forecast(self.request.user, analytics.forecast_date(date_to))
+        data['missing_rates'] = missing_rates(self.request.user)
+
+        return data
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
+        # Повторные открытия с теми же параметрами не обращаются к базе, пока не изменится версия пользователя
+        context.update(cached_for_user(
+            self.request.user.pk, 'analytics', self.get_window(), self.build_analytics
+        ))
+        context['currency'] = base_currency()
+        return context
 
-        today = now().date()
-        month_start = today.replace(day=1)
 
-        transactions = Transaction.objects.filter(
-            account__owner=user,
-            date__gte=month_start
-        )
+@login_required
+async def analytics_data(request):
+    user = await request.auser()
+    date_from, date_to, granularity = analytics.parse_window(request.GET)
+    names = [name for name in request.GET.getlist('section') if name in analytics.SECTIONS] or list(analytics.SECTIONS)
 
-        context['total_income'] = transactions.filter(type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-        context['total_expense'] = transactions.filter(type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-        context['balance'] = context['total_income'] - context['total_expense']
+    data = await acached_for_user(
+        user.pk, 'analytics_data', [date_from, date_to, granularity, *names],
+        lambda: analytics.load_sections(user, date_from, date_to, granularity, names),
+    )
+    return JsonResponse(dict(data, granularity=granularity, currency=base_currency()))
 
-        context['expense_by_category'] = list(
-            transactions.filter(type='expense')
-            .values('category__name')
-            .annotate(total=Sum('amount'))
-            .order_by('-total')
-        )
-        context['income_by_category'] = list(
-            transactions.filter(type='income')
-            .values('category__name')
-            .annotate(total=Sum('amount'))
-            .order_by('-total')
-        )
 
-        last_6_months = [today.replace(day=1)]
-        for i in range(1, 6):
-            last_6_months.append(today.replace(day=1) - relativedelta(months=i))
-        last_6_months.reverse()
-
-        monthly_data = []
-        for month in last_6_months:
-            month_trans = Transaction.objects.filter(
-                account__owner=user,
-                date__year=month.year,
-                date__month=month.month
-            )
-            total_income = month_trans.filter(type='income').aggregate(Sum('amount'))['amount__sum'] or 0
-            total_expense = month_trans.filter(type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-            monthly_data.append({
-                'month': month.strftime('%b %Y'),
-                'income': total_income,
-                'expense': total_expense
-            })
-        context['monthly_data'] = monthly_data
-
-        context['expense_labels'] = json.dumps([e['category__name'] for e in context['expense_by_category']])
-        context['expense_data'] = json.dumps([float(e['total']) for e in context['expense_by_category']])
-
-        context['income_labels'] = json.dumps([e['category__name'] for e in context['income_by_category']])
-        context['income_data'] = json.dumps([float(e['total']) for e in context['income_by_category']])
-
-        context['months'] = json.dumps([m['month'] for m in context['monthly_data']])
-        context['monthly_income'] = json.dumps([float(m['income']) for m in context['monthly_data']])
-        context['monthly_expense'] = json.dumps([float(m['expense']) for m in context['monthly_data']])
+class NotificationListView(LoginRequiredMixin, ListView):
+    model = Notification
+    template_name = 'expenses/notification_list.html'
+    context_object_name = 'notifications'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return Notification.objects.filter(owner=self.request.user).select_related('budget__category')
+
+
+class NotificationReadView(LoginRequiredMixin, View):
+    def post(self, request):
+        unread = Notification.objects.filter(owner=request.user, read_at__isnull=True)
+        pk = request.POST.get('pk')
+        if pk is not None:
+            unread = unread.filter(pk=pk) if pk.isdigit() else unread.none()
+        if unread.update(read_at=timezone.now()):
+            invalidate_user(request.user.pk)
+        return redirect('expenses:notification_list')
+
 
+class CacheStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return JsonResponse({'cache': cache_stats.snapshot()})
+
+
+class MetricsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    template_name = 'expenses/metrics.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['views'] = metrics_store.summary()
+        context['cache'] = cache_stats.snapshot()
         return context
 
 # Home page